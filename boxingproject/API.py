@@ -1,24 +1,26 @@
-import requests
-import pandas as pd
+"""Fetch current boxing odds and append them to boxing_odds.csv.
 
-# 🔐 Replace this with your actual API key
-API_KEY = "89c61046d8ed0ccf9ebfa3996ef443cc"
+Kept as a script for existing cron jobs; the work is done by
+:mod:`odds_api`, which is also exposed as ``boxing_app.py fetch``.
+"""
+import os
+from pathlib import Path
 
-# 📡 API endpoint and parameters
-url = "https://api.the-odds-api.com/v4/sports/boxing_boxing/odds"
-params = {
-    "apiKey": API_KEY,
-    "regions": "us,uk,eu",       # Betting regions
-    "markets": "h2h",            # "head-to-head" odds
-    "oddsFormat": "decimal"      # You can also use 'american' or 'fractional'
-}
+try:  # support running as a module or a script
+    from .odds_api import OddsAPIError, append_rows, fetch_odds
+except ImportError:  # pragma: no cover - fallback when executed as a script
+    from odds_api import OddsAPIError, append_rows, fetch_odds
 
-# 🚀 Send the GET request
-response = requests.get(url, params=params)
+# 🔐 Set ODDS_API_KEY to your API key
+API_KEY = os.environ.get("ODDS_API_KEY")
 
-# 📦 Convert response to JSON
-if response.status_code == 200:
-    data = response.json()
-    print(f"Received {len(data)} events.")
-else:
-    print("Error:", response.status_code, response.text)
+if __name__ == "__main__":
+    if not API_KEY:
+        raise SystemExit("Set ODDS_API_KEY to your odds API key")
+    try:
+        result = fetch_odds(API_KEY)
+    except OddsAPIError as exc:
+        print("Error:", exc.status, exc.body.decode("utf-8", "replace"))
+    else:
+        append_rows(Path(__file__).with_name("boxing_odds.csv"), result.rows, dedupe=True)
+        print(f"Received {result.events} events.")
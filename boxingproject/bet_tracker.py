@@ -2,10 +2,34 @@
 from __future__ import annotations
 
 import csv
+import io
+import locale
+import os
+import threading
+from contextlib import contextmanager
 from dataclasses import dataclass
 from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import List
+from typing import Iterable, Iterator, List, NamedTuple, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no advisory locks on Windows
+    fcntl = None
+
+try:  # support running as a module or a script
+    from .sidecar import covers_prefix, digest_before, read_state, write_state
+except ImportError:  # pragma: no cover - fallback when executed as a script
+    from sidecar import covers_prefix, digest_before, read_state, write_state
+
+BET_COLUMNS = ["date", "fighter", "odds", "stake", "bookmaker", "result", "payout"]
+# Bets files with these suffixes are SQLite databases; anything else is CSV.
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+# Rows are encoded by hand so each is one write(); match what open() reads.
+_ENCODING = locale.getpreferredencoding(False)
+TOTALS_SUFFIX = ".totals"
+_TOTALS_VERSION = 1
 
 
 @dataclass
@@ -19,38 +43,98 @@ class Bet:
     payout: float | None = None
 
 
-class BetTracker:
-    """Track bets in a CSV file using only the standard library."""
+class BetTotals(NamedTuple):
+    count: int
+    stake: float
+    profit: float
 
-    def __init__(self, filepath: str | Path | None = None) -> None:
-        self.filepath = Path(filepath) if filepath else Path(__file__).with_name("bets.csv")
-        self.bets: List[Bet] = []
-
-        if self.filepath.exists():
-            with self.filepath.open(newline="") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    self.bets.append(
-                        Bet(
-                            datetime.fromisoformat(row["date"]),
-                            row["fighter"],
-                            float(row["odds"]),
-                            float(row["stake"]),
-                            row["bookmaker"],
-                            row.get("result") or None,
-                            float(row["payout"]) if row.get("payout") else None,
-                        )
-                    )
 
-    def add_bet(self, bet: Bet) -> None:
-        """Append a bet to the CSV file and in-memory list."""
-        self.bets.append(bet)
-        write_header = not self.filepath.exists()
-        with self.filepath.open("a", newline="") as f:
-            writer = csv.writer(f)
-            if write_header:
-                writer.writerow(["date", "fighter", "odds", "stake", "bookmaker", "result", "payout"])
-            writer.writerow([
+def _parse_bet(row: dict) -> Bet:
+    return Bet(
+        datetime.fromisoformat(row["date"]),
+        row["fighter"],
+        float(row["odds"]),
+        float(row["stake"]),
+        row["bookmaker"],
+        row.get("result") or None,
+        float(row["payout"]) if row.get("payout") else None,
+    )
+
+
+def _summary_row(b: Bet) -> dict:
+    return {
+        "date": b.date.strftime("%Y-%m-%d"),
+        "fighter": b.fighter,
+        "odds": b.odds,
+        "stake": b.stake,
+        "bookmaker": b.bookmaker,
+        "result": b.result or "",
+        "payout": b.payout or 0.0,
+        "profit": round((b.payout or 0.0) - b.stake, 2),
+    }
+
+
+def _tally(stakes: Iterable[Tuple[float, float | None]], totals: BetTotals = BetTotals(0, 0.0, 0.0)) -> BetTotals:
+    """Add ``(stake, payout)`` pairs to ``totals``, summing in ledger order."""
+    count, staked, profit = totals
+    for stake, payout in stakes:
+        count += 1
+        staked += stake
+        profit += (payout or 0.0) - stake
+    return BetTotals(count, staked, profit)
+
+
+# Running totals
+# --------------
+# Bets are only ever appended, so, like the odds checkpoint, the totals of
+# the rows read so far are stored next to a CSV ledger together with the
+# byte offset they cover and a digest of the bytes just before it.  A later
+# call verifies the digest and only reads what was appended; a rewritten
+# ledger fails the check and is summed from the start.
+
+def totals_path(path: Path) -> Path:
+    """Return the running-totals sidecar path used for bets CSV ``path``."""
+    return path.with_name(path.name + TOTALS_SUFFIX)
+
+
+class _Pending:
+    """Rows handed to the group commit by one :meth:`CSVBetStore.append` call."""
+
+    __slots__ = ("data", "done", "error")
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.done = False
+        self.error: BaseException | None = None
+
+
+class CSVBetStore:
+    """Bets kept as rows of a CSV file, oldest first.
+
+    Writers never read the existing rows, only the header, once per store,
+    so the cost of recording a bet does not grow with the ledger.  Every
+    write holds an exclusive ``flock`` on the file, where available, and
+    goes through a descriptor opened with ``O_APPEND``; one bet is a single
+    ``write()``, so concurrent processes neither duplicate the header nor
+    interleave rows.  The lock covers only that write; the fsync runs after
+    it is released, so processes appending at once do not queue behind each
+    other's disk flushes.  Threads sharing a store also group-commit:
+    whichever one gets to write takes the rows of all that queued meanwhile
+    and fsyncs them once.  Writers adding many bets should use :meth:`extend`.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._header_checked = False
+        self._queue: List[_Pending] = []
+        self._queue_lock = threading.Lock()
+        self._commit_lock = threading.Lock()
+
+    @staticmethod
+    def _encode(bets: Iterable[Bet]) -> bytes:
+        buf = io.StringIO()
+        csv.writer(buf).writerows(
+            [
                 bet.date.isoformat(),
                 bet.fighter,
                 bet.odds,
@@ -58,28 +142,355 @@ class BetTracker:
                 bet.bookmaker,
                 bet.result or "",
                 bet.payout if bet.payout is not None else "",
-            ])
-
-    def summary(self) -> List[dict]:
-        """Return bet history with individual profits and total."""
-        rows: List[dict] = []
-        total = 0.0
-        for b in self.bets:
-            payout = b.payout or 0.0
-            profit = payout - b.stake
-            total += profit
-            rows.append(
-                {
-                    "date": b.date.strftime("%Y-%m-%d"),
-                    "fighter": b.fighter,
-                    "odds": b.odds,
-                    "stake": b.stake,
-                    "bookmaker": b.bookmaker,
-                    "result": b.result or "",
-                    "payout": payout,
-                    "profit": round(profit, 2),
+            ]
+            for bet in bets
+        )
+        return buf.getvalue().encode(_ENCODING)
+
+    @contextmanager
+    def _locked(self) -> Iterator[int]:
+        """Yield an append-mode descriptor holding the file's exclusive lock."""
+        fd = os.open(self.path, os.O_RDWR | os.O_APPEND | os.O_CREAT | getattr(os, "O_BINARY", 0), 0o666)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield fd
+        finally:
+            os.close(fd)  # also releases the lock
+
+    def _header(self, fd: int) -> bytes:
+        """Return the header an empty file needs, checking an existing one once."""
+        if os.fstat(fd).st_size == 0:
+            header = io.StringIO()
+            csv.writer(header).writerow(BET_COLUMNS)
+            return header.getvalue().encode(_ENCODING)
+        if not self._header_checked:
+            os.lseek(fd, 0, os.SEEK_SET)
+            first = os.read(fd, 4096).split(b"\n", 1)[0].decode(_ENCODING, "replace")
+            if next(csv.reader([first]), []) != BET_COLUMNS:
+                raise ValueError(f"{self.path} does not start with the bets header {','.join(BET_COLUMNS)}")
+            self._header_checked = True
+        return b""
+
+    @staticmethod
+    def _unlock(fd: int) -> None:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _write(fd: int, data: bytes) -> None:
+        view = memoryview(data)
+        while view:  # a regular file takes it in one write() unless the disk is full
+            view = view[os.write(fd, view):]
+
+    def append(self, bet: Bet) -> None:
+        """Durably append one bet, sharing the write with concurrent appends.
+
+        Appends from threads of this process share one write and fsync.
+        Other processes wait for the file lock only while a row is written,
+        not while it is flushed to disk.
+        """
+        pending = _Pending(self._encode([bet]))
+        with self._queue_lock:
+            self._queue.append(pending)
+        with self._commit_lock:
+            if not pending.done:  # no other thread has written it yet
+                with self._queue_lock:
+                    batch, self._queue = self._queue, []
+                try:
+                    with self._locked() as fd:
+                        self._write(fd, self._header(fd) + b"".join(p.data for p in batch))
+                        self._unlock(fd)  # the rows are in the file; flush without blocking others
+                        os.fsync(fd)
+                except BaseException as exc:
+                    for p in batch:
+                        p.error = exc
+                for p in batch:
+                    p.done = True
+        if pending.error is not None:
+            raise pending.error
+
+    def extend(self, bets: Iterable[Bet], chunk_size: int = 1 << 20) -> int:
+        """Append ``bets`` through one buffer with a single fsync.
+
+        Returns the number of bets written.  The file stays locked until
+        all are written (but not while they are flushed), and if ``bets`` raises part way through, the rows
+        already written are truncated away again.
+        """
+        count = 0
+        with self._commit_lock, self._locked() as fd:
+            start = os.fstat(fd).st_size
+            try:
+                buf = [self._header(fd)]
+                size = 0
+                for count, bet in enumerate(bets, 1):
+                    row = self._encode([bet])
+                    buf.append(row)
+                    size += len(row)
+                    if size >= chunk_size:
+                        self._write(fd, b"".join(buf))
+                        buf, size = [], 0
+                self._write(fd, b"".join(buf))
+            except BaseException:
+                os.ftruncate(fd, start)
+                raise
+            self._unlock(fd)
+            os.fsync(fd)
+        return count
+
+    def __iter__(self) -> Iterator[Bet]:
+        return self.page()
+
+    def page(self, offset: int = 0, limit: int | None = None) -> Iterator[Bet]:
+        """Yield ``limit`` bets (all if None) from index ``offset``, streaming the file."""
+        if not self.path.exists():
+            return
+        with self.path.open(newline="") as f:
+            stop = None if limit is None else offset + limit
+            yield from map(_parse_bet, islice(csv.DictReader(f), offset, stop))
+
+    def totals(self) -> BetTotals:
+        """Return the ledger totals, reading only rows appended since the last call."""
+        sidecar = totals_path(self.path)
+        try:
+            f = self.path.open("rb")
+        except FileNotFoundError:
+            return BetTotals(0, 0.0, 0.0)
+        with f:
+            state = read_state(sidecar, _TOTALS_VERSION)
+            if state is not None and covers_prefix(f, state, os.fstat(f.fileno()).st_size):
+                header, start, totals = state["header"], state["offset"], BetTotals(*state["totals"])
+            else:
+                f.seek(0)
+                first = f.readline()
+                if not first.endswith(b"\n"):
+                    return BetTotals(0, 0.0, 0.0)
+                header = next(csv.reader([first.decode(_ENCODING)]))
+                start, totals, state = len(first), BetTotals(0, 0.0, 0.0), None
+            f.seek(start)
+            end = start
+
+            def lines() -> Iterator[str]:
+                nonlocal end
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        return  # a row still being written
+                    end += len(line)
+                    yield line.decode(_ENCODING)
+
+            rows = csv.DictReader(lines(), header)
+            stakes = ((float(r["stake"]), float(r["payout"]) if r.get("payout") else None) for r in rows)
+            totals = _tally(stakes, totals)
+            if state is None or end != start:
+                state = {
+                    "version": _TOTALS_VERSION,
+                    "offset": end,
+                    "digest": digest_before(f, end),
+                    "header": header,
+                    "totals": list(totals),
                 }
-            )
-        rows.append({"date": "TOTAL", "profit": round(total, 2)})
-        return rows
+                write_state(sidecar, state)
+        return totals
+
+
+class SQLiteBetStore:
+    """Bets kept in a SQLite database.
+
+    The database runs in WAL mode so readers never block the writer, and
+    ``date``, ``fighter`` and ``bookmaker`` are indexed for ad-hoc queries.
+    Appending is a single INSERT, and triggers keep the running totals in
+    the one-row ``bet_totals`` table, so neither loads the history.
+    """
+
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS bets (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            fighter TEXT NOT NULL,
+            odds REAL NOT NULL,
+            stake REAL NOT NULL,
+            bookmaker TEXT NOT NULL,
+            result TEXT,
+            payout REAL
+        );
+        CREATE INDEX IF NOT EXISTS bets_date ON bets (date);
+        CREATE INDEX IF NOT EXISTS bets_fighter ON bets (fighter);
+        CREATE INDEX IF NOT EXISTS bets_bookmaker ON bets (bookmaker);
+        CREATE TABLE IF NOT EXISTS bet_totals (
+            id INTEGER PRIMARY KEY CHECK (id = 0),
+            count INTEGER NOT NULL,
+            stake REAL NOT NULL,
+            profit REAL NOT NULL
+        );
+        -- Ledgers created before bet_totals existed are summed once.
+        INSERT OR IGNORE INTO bet_totals
+            SELECT 0, COUNT(*), TOTAL(stake), TOTAL(COALESCE(payout, 0) - stake) FROM bets
+            WHERE NOT EXISTS (SELECT 1 FROM bet_totals);
+        CREATE TRIGGER IF NOT EXISTS bets_insert_totals AFTER INSERT ON bets BEGIN
+            UPDATE bet_totals SET count = count + 1, stake = stake + NEW.stake,
+                profit = profit + (COALESCE(NEW.payout, 0) - NEW.stake);
+        END;
+        CREATE TRIGGER IF NOT EXISTS bets_delete_totals AFTER DELETE ON bets BEGIN
+            UPDATE bet_totals SET count = count - 1, stake = stake - OLD.stake,
+                profit = profit - (COALESCE(OLD.payout, 0) - OLD.stake);
+        END;
+        CREATE TRIGGER IF NOT EXISTS bets_update_totals AFTER UPDATE OF stake, payout ON bets BEGIN
+            UPDATE bet_totals SET stake = stake - OLD.stake + NEW.stake,
+                profit = profit - (COALESCE(OLD.payout, 0) - OLD.stake) + (COALESCE(NEW.payout, 0) - NEW.stake);
+        END;
+    """
+    _INSERT = (
+        "INSERT INTO bets (date, fighter, odds, stake, bookmaker, result, payout) VALUES (?, ?, ?, ?, ?, ?, ?)"
+    )
+    _SELECT = (
+        "SELECT date, fighter, odds, stake, bookmaker, result, payout FROM bets ORDER BY id LIMIT ? OFFSET ?"
+    )
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._conn = None
+
+    def connection(self):
+        """Return the open ``sqlite3`` connection, creating the schema once."""
+        if self._conn is None:
+            import sqlite3  # only SQLite ledgers pay for the import
+
+            conn = sqlite3.connect(self.path, timeout=30.0)  # wait out other writers' transactions
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; WAL keeps it consistent
+            conn.executescript(self._SCHEMA)
+            self._conn = conn
+        return self._conn
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    @staticmethod
+    def _params(bet: Bet) -> tuple:
+        return (bet.date.isoformat(), bet.fighter, bet.odds, bet.stake, bet.bookmaker, bet.result, bet.payout)
+
+    def append(self, bet: Bet) -> None:
+        """Insert one bet."""
+        conn = self.connection()
+        with conn:
+            conn.execute(self._INSERT, self._params(bet))
+
+    def extend(self, bets: Iterable[Bet]) -> int:
+        """Insert ``bets`` in one transaction; returns how many were added."""
+        conn = self.connection()
+        with conn:
+            return conn.executemany(self._INSERT, (self._params(b) for b in bets)).rowcount
+
+    def __iter__(self) -> Iterator[Bet]:
+        return self.page()
+
+    def page(self, offset: int = 0, limit: int | None = None) -> Iterator[Bet]:
+        """Yield ``limit`` bets (all if None) from index ``offset``."""
+        rows = self.connection().execute(self._SELECT, (-1 if limit is None else limit, offset))
+        for date, fighter, odds, stake, bookmaker, result, payout in rows:
+            yield Bet(datetime.fromisoformat(date), fighter, odds, stake, bookmaker, result or None, payout)
+
+    def totals(self) -> BetTotals:
+        """Return the running totals kept by the triggers."""
+        return BetTotals(*self.connection().execute("SELECT count, stake, profit FROM bet_totals").fetchone())
+
+
+def open_store(path: Path) -> CSVBetStore | SQLiteBetStore:
+    """Return the storage backend for bets file ``path`` based on its suffix."""
+    if path.suffix.lower() in SQLITE_SUFFIXES:
+        return SQLiteBetStore(path)
+    return CSVBetStore(path)
+
 
+def migrate_csv_to_sqlite(csv_path: Path, db_path: Path) -> int:
+    """Copy every bet from ``csv_path`` into a new SQLite ledger at ``db_path``.
+
+    Returns the number of bets copied.  Refuses to write into a database
+    that already holds bets, so running it twice cannot duplicate them.
+    """
+    store = SQLiteBetStore(db_path)
+    try:
+        conn = store.connection()
+        if conn.execute("SELECT 1 FROM bets LIMIT 1").fetchone() is not None:
+            raise ValueError(f"{db_path} already contains bets")
+        with conn:
+            conn.executemany(store._INSERT, (store._params(b) for b in CSVBetStore(csv_path)))
+        return conn.execute("SELECT COUNT(*) FROM bets").fetchone()[0]
+    finally:
+        store.close()
+
+
+class BetTracker:
+    """Track bets in a CSV file or SQLite database using only the standard library.
+
+    The storage backend is chosen by :func:`open_store` unless ``store`` is
+    given.  History is read on first access to :attr:`bets`, so recording
+    a bet does not load it.  A ``write_only`` tracker refuses to read the
+    history at all, for callers that must stay fast on any ledger size.
+    """
+
+    def __init__(
+        self,
+        filepath: str | Path | None = None,
+        store: CSVBetStore | SQLiteBetStore | None = None,
+        write_only: bool = False,
+    ) -> None:
+        self.filepath = Path(filepath) if filepath else Path(__file__).with_name("bets.csv")
+        self.store = store if store is not None else open_store(self.filepath)
+        self.write_only = write_only
+        self._bets: List[Bet] | None = None
+
+    def _readable(self) -> None:
+        if self.write_only:
+            raise RuntimeError(f"{self.filepath} was opened write-only")
+
+    @property
+    def bets(self) -> List[Bet]:
+        """All recorded bets, oldest first."""
+        self._readable()
+        if self._bets is None:
+            self._bets = list(self.store)
+        return self._bets
+
+    def add_bet(self, bet: Bet) -> None:
+        """Append a bet to the store and, if loaded, the in-memory list."""
+        self.store.append(bet)
+        if self._bets is not None:
+            self._bets.append(bet)
+
+    def add_bets(self, bets: Iterable[Bet]) -> int:
+        """Append many bets with one write to the store; returns how many."""
+        if self._bets is None:
+            return self.store.extend(bets)
+        bets = list(bets)
+        count = self.store.extend(bets)
+        self._bets.extend(bets)
+        return count
+
+    def totals(self) -> BetTotals:
+        """Return the number of bets, total stake and total profit."""
+        self._readable()
+        if self._bets is not None:
+            return _tally((b.stake, b.payout) for b in self._bets)
+        return self.store.totals()
+
+    def rows(self, offset: int = 0, limit: int | None = None) -> Iterator[dict]:
+        """Yield summary rows for ``limit`` bets (all if None) from index ``offset``."""
+        self._readable()
+        if self._bets is not None:
+            bets = islice(self._bets, offset, None if limit is None else offset + limit)
+        else:
+            bets = self.store.page(offset, limit)
+        return map(_summary_row, bets)
+
+    def summary(self, offset: int = 0, limit: int | None = None) -> List[dict]:
+        """Return bet history with individual profits and total.
+
+        ``offset`` and ``limit`` select a page of the history; the TOTAL row
+        always covers the whole ledger.
+        """
+        rows = list(self.rows(offset, limit))
+        rows.append({"date": "TOTAL", "profit": round(self.totals().profit, 2)})
+        return rows
@@ -1,100 +1,133 @@
-"""Command-line boxing odds and bet tracking app using only stdlib."""
+"""Command-line boxing odds and bet tracking app using only stdlib.
+
+The CLI is run thousands of times a day from shell pipelines, so each
+subcommand imports only the modules it uses: recording a bet never loads
+the odds code and the reports never load the bet tracker or the API
+client.  ``tools/startup_budget.py`` checks the import cost per subcommand.
+When ``serve`` is running the reports and summary are answered by the
+daemon in :mod:`odds_daemon` instead of reading the files again.
+"""
 from __future__ import annotations
 
-import argparse
-import csv
-from collections import defaultdict
+import os
 from datetime import datetime
 from pathlib import Path
-from statistics import mean
-from typing import List
+from typing import TYPE_CHECKING, Iterable, Iterator, List
+
+if TYPE_CHECKING:  # pragma: no cover
+    import argparse
 
-try:  # support running as a module or a script
-    from .bet_tracker import Bet, BetTracker
-except ImportError:  # pragma: no cover - fallback when executed as a script
-    from bet_tracker import Bet, BetTracker
+    from bet_tracker import BetTracker
+    from odds_aggregate import OddsAggregate
+    from odds_store import OddsRecord, OddsTable
 
 DEFAULT_ODDS_FILE = Path(__file__).with_name("boxing_odds.csv")
 DEFAULT_BETS_FILE = Path(__file__).with_name("bets.csv")
+API_CACHE_DIR = ".odds_api_cache"
+
+FIGHT_COLUMNS = ["event_id", "time"]
+BEST_COLUMNS = ["event_id", "time", "fighter", "bookmaker", "decimal_odds"]
+VALUE_COLUMNS = ["event_id", "time", "fighter", "bookmaker", "avg_odds", "best_odds", "value_pct"]
+
+
+def load_odds(path: Path = DEFAULT_ODDS_FILE, use_cache: bool = True) -> OddsTable:
+    """Load odds rows from a CSV file into a columnar :class:`OddsTable`.
+
+    Parsed rows are kept in a binary cache next to the CSV which is reused
+    until the CSV changes.
+    """
+    try:  # support running as a module or a script
+        from .odds_store import OddsTable, load_table
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from odds_store import OddsTable, load_table
+
+    if not path.exists():
+        return OddsTable()
+    return load_table(path, use_cache)
+
+
+def iter_odds(path: Path = DEFAULT_ODDS_FILE) -> Iterator[OddsRecord]:
+    """Yield odds records from a CSV file one at a time.
 
+    Unlike :func:`load_odds` nothing is retained, so arbitrarily large files
+    can be analysed in constant memory.
+    """
+    try:  # support running as a module or a script
+        from .odds_store import iter_records
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from odds_store import iter_records
 
-def load_odds(path: Path = DEFAULT_ODDS_FILE) -> List[dict]:
-    """Load odds rows from a CSV file, parsing times and odds."""
     if not path.exists():
-        return []
-    with path.open(newline="") as f:
-        reader = csv.DictReader(f)
-        rows: List[dict] = []
-        for row in reader:
-            row["decimal_odds"] = float(row["decimal_odds"])
-            # Parse time if provided; fallback to raw string
-            try:
-                row["time"] = datetime.fromisoformat(row["time"])
-            except Exception:
-                row["time"] = row["time"]
-            rows.append(row)
-        return rows
-
-
-def upcoming_fights(rows: List[dict]) -> List[dict]:
+        return iter(())
+    return iter_records(path)
+
+
+def aggregate_odds(rows: Iterable[OddsRecord]) -> OddsAggregate:
+    """Summarise ``rows`` in a single pass for the fights/best/value reports.
+
+    ``rows`` may be an :class:`OddsTable` or any iterable of records, such as
+    the generator returned by :func:`iter_odds`.
+    """
+    try:  # support running as a module or a script
+        from .odds_aggregate import OddsAggregate
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from odds_aggregate import OddsAggregate
+
+    return OddsAggregate.from_records(rows)
+
+
+def upcoming_fights(rows: Iterable[OddsRecord]) -> List[dict]:
     """Return upcoming fights sorted by earliest available time."""
-    fights: dict[str, datetime] = {}
-    for r in rows:
-        eid = r["event_id"]
-        time = r["time"]
-        if eid not in fights or time < fights[eid]:
-            fights[eid] = time
-    return [{"event_id": eid, "time": fights[eid]} for eid in sorted(fights, key=fights.get)]
+    return aggregate_odds(rows).fights()
 
 
-def best_odds(rows: List[dict]) -> List[dict]:
+def best_odds(rows: Iterable[OddsRecord]) -> List[dict]:
     """Return best odds for each fighter in every event."""
-    best: dict[tuple[str, str], dict] = {}
-    for r in rows:
-        key = (r["event_id"], r["fighter"])
-        if key not in best or r["decimal_odds"] > best[key]["decimal_odds"]:
-            best[key] = {
-                "event_id": r["event_id"],
-                "time": r["time"],
-                "fighter": r["fighter"],
-                "bookmaker": r["bookmaker"],
-                "decimal_odds": r["decimal_odds"],
-            }
-    return list(best.values())
-
-
-def value_bets(rows: List[dict], threshold: float = 0.05) -> List[dict]:
-    """Identify value bets where best odds exceed average by ``threshold``."""
-    grouped: defaultdict[tuple[str, str], List[dict]] = defaultdict(list)
-    for r in rows:
-        grouped[(r["event_id"], r["fighter"])].append(r)
-
-    results: List[dict] = []
-    for (event_id, fighter), lst in grouped.items():
-        odds = [r["decimal_odds"] for r in lst]
-        avg_odds = mean(odds)
-        best_row = max(lst, key=lambda r: r["decimal_odds"])
-        value_pct = (best_row["decimal_odds"] - avg_odds) / avg_odds
-        if value_pct >= threshold:
-            results.append(
-                {
-                    "event_id": event_id,
-                    "time": best_row["time"],
-                    "fighter": fighter,
-                    "bookmaker": best_row["bookmaker"],
-                    "avg_odds": round(avg_odds, 2),
-                    "best_odds": best_row["decimal_odds"],
-                    "value_pct": round(value_pct, 2),
-                }
-            )
-    results.sort(key=lambda r: r["value_pct"], reverse=True)
-    return results
+    return aggregate_odds(rows).best()
+
+
+def value_bets(rows: Iterable[OddsRecord], threshold: float = 0.05, top: int | None = None) -> List[dict]:
+    """Identify value bets where best odds exceed average by ``threshold``.
+
+    With ``top`` only the ``top`` best are returned.
+    """
+    return aggregate_odds(rows).value(threshold, top)
+
+
+def _add_api_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--api-key", default=os.environ.get("ODDS_API_KEY"), help="API key (default: $ODDS_API_KEY)"
+    )
+    # Defaults live in odds_api, which is only imported by fetch and poll.
+    parser.add_argument("--sports", help="Comma separated sport keys (default: boxing_boxing)")
+    parser.add_argument("--regions", help="Comma separated regions (default: us,uk,eu)")
+    parser.add_argument("--markets", help="Comma separated markets (default: h2h)")
+    parser.add_argument("--base-url", help="Odds API base URL (default: the-odds-api.com v4)")
+    parser.add_argument("--cache-dir", type=Path, help="Response cache directory (default: next to the odds file)")
+    parser.add_argument(
+        "--keep-duplicates",
+        action="store_true",
+        help="Append quotes even when the fight time and price have not changed",
+    )
 
 
 def _parse_args() -> argparse.Namespace:
+    import argparse
+
     parser = argparse.ArgumentParser(description="Boxing betting utilities")
     parser.add_argument("--odds-file", type=Path, default=DEFAULT_ODDS_FILE, help="Path to odds CSV")
-    parser.add_argument("--bets-file", type=Path, default=DEFAULT_BETS_FILE, help="Path to bets CSV")
+    parser.add_argument("--bets-file", type=Path, default=DEFAULT_BETS_FILE, help="Path to bets CSV or SQLite .db")
+    parser.add_argument(
+        "--workers", type=int, default=1, help="Parse large odds files with N worker processes"
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Stream the whole odds file in constant memory, ignoring caches and checkpoints",
+    )
+    parser.add_argument(
+        "--no-daemon", action="store_true", help="Read the files directly even when `serve` is running"
+    )
 
     sub = parser.add_subparsers(dest="command", required=True)
 
@@ -103,6 +136,27 @@ def _parse_args() -> argparse.Namespace:
 
     value = sub.add_parser("value", help="List potential value bets")
     value.add_argument("--threshold", type=float, default=0.05, help="Minimum value percentage")
+    value.add_argument("--top", type=int, metavar="K", help="Only show the K best value bets")
+
+    report = sub.add_parser("report", help="Show fights, best odds and value bets together")
+    report.add_argument("--threshold", type=float, default=0.05, help="Minimum value percentage")
+
+    fetch = sub.add_parser("fetch", help="Download current odds and append them to the odds file")
+    _add_api_arguments(fetch)
+    fetch.add_argument("--cache-ttl", type=float, default=60.0, help="Seconds a cached response stays fresh")
+
+    poll = sub.add_parser("poll", help="Keep polling the odds API, favouring fights about to start")
+    _add_api_arguments(poll)
+    poll.add_argument("--max-rate", type=float, default=10.0, help="Maximum requests per minute")
+    poll.add_argument("--quota-days", type=float, default=30.0, help="Days the remaining API quota must last")
+    poll.add_argument("--discovery-minutes", type=float, default=60.0, help="Minutes between full sweeps")
+    poll.add_argument("--cycles", type=int, help="Stop after this many request batches")
+
+    compact_help = (
+        "Remove repeated unchanged quotes from the odds file;"
+        " avg_odds and value_pct then average over price changes, not polls"
+    )
+    sub.add_parser("compact", help=compact_help, description=compact_help)
 
     add_bet = sub.add_parser("add-bet", help="Record a bet")
     add_bet.add_argument("fighter")
@@ -112,12 +166,26 @@ def _parse_args() -> argparse.Namespace:
     add_bet.add_argument("--result", choices=["win", "loss"])
     add_bet.add_argument("--payout", type=float)
 
-    sub.add_parser("summary", help="Show bet history and profits")
+    import_bets = sub.add_parser("import-bets", help="Append every bet from another bets CSV in one write")
+    import_bets.add_argument("source", type=Path, help="CSV with the same columns as the bets file")
+
+    summary = sub.add_parser("summary", help="Show bet history and profits")
+    summary.add_argument("--offset", type=int, default=0, help="Skip the first N bets")
+    summary.add_argument("--limit", type=int, help="Show at most N bets; 0 shows only the total")
+
+    migrate = sub.add_parser("migrate-bets", help="Copy the bets CSV into a new SQLite database")
+    migrate.add_argument("database", type=Path, help="SQLite file to create, e.g. bets.db")
+
+    serve = sub.add_parser("serve", help="Keep odds and bets in memory and answer queries over a Unix socket")
+    serve.add_argument("--http-port", type=int, help="Also serve a JSON API on this port")
+    serve.add_argument("--http-host", default="127.0.0.1", help="Address for the JSON API")
 
     return parser.parse_args()
 
 
 def _format(value: object) -> str:
+    if value is None:
+        return ""
     if isinstance(value, float):
         return f"{value:.2f}"
     if isinstance(value, datetime):
@@ -125,37 +193,180 @@ def _format(value: object) -> str:
     return str(value)
 
 
-def _print_table(rows: List[dict], columns: List[str] | None = None) -> None:
+def _table_lines(rows: List[dict], columns: List[str] | None = None) -> List[str]:
     if not rows:
-        print("No data available")
-        return
+        return ["No data available"]
     if columns is None:
         columns = list(rows[0].keys())
     widths = {c: max(len(c), *(len(_format(r.get(c, ""))) for r in rows)) for c in columns}
     header = " ".join(c.ljust(widths[c]) for c in columns)
-    print(header)
-    print("-" * len(header))
+    lines = [header, "-" * len(header)]
     for r in rows:
-        line = " ".join(_format(r.get(c, "")).ljust(widths[c]) for c in columns)
-        print(line)
+        lines.append(" ".join(_format(r.get(c, "")).ljust(widths[c]) for c in columns))
+    return lines
 
 
-def main() -> None:
-    args = _parse_args()
+def render_reports(agg: OddsAggregate, command: str, threshold: float = 0.05, top: int | None = None) -> str:
+    """Return the text printed by the fights, best, value or report command."""
+    sections = []
+    if command in {"fights", "report"}:
+        sections.append(("Upcoming fights", _table_lines(agg.fights(), FIGHT_COLUMNS)))
+    if command in {"best", "report"}:
+        sections.append(("Best odds", _table_lines(agg.best(), BEST_COLUMNS)))
+    if command in {"value", "report"}:
+        sections.append(("Value bets", _table_lines(agg.value(threshold, top), VALUE_COLUMNS)))
+    if command != "report":
+        return "\n".join(sections[0][1]) + "\n"
+    return "\n".join(f"== {title} ==\n" + "\n".join(lines) + "\n" for title, lines in sections)
+
+
+def render_summary(tracker: BetTracker, offset: int = 0, limit: int | None = None) -> str:
+    """Return the text printed by the summary command."""
+    return "\n".join(_table_lines(tracker.summary(offset, limit))) + "\n"
+
+
+def _ask_daemon(args: argparse.Namespace) -> bool:
+    """Print the daemon's answer to this command; False if it gave none."""
+    if args.no_daemon or args.no_cache:
+        return False
+    try:  # support running as a module or a script
+        from .odds_daemon import query, socket_path
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from odds_daemon import query, socket_path
 
-    if args.command in {"fights", "best", "value"}:
-        odds = load_odds(args.odds_file)
-        if args.command == "fights":
-            _print_table(upcoming_fights(odds), ["event_id", "time"])
-        elif args.command == "best":
-            _print_table(best_odds(odds), ["event_id", "time", "fighter", "bookmaker", "decimal_odds"])
-        elif args.command == "value":
-            _print_table(
-                value_bets(odds, threshold=args.threshold),
-                ["event_id", "time", "fighter", "bookmaker", "avg_odds", "best_odds", "value_pct"],
-            )
-    elif args.command == "add-bet":
-        tracker = BetTracker(args.bets_file)
+    sock = socket_path(args.odds_file)
+    if not sock.exists():
+        return False
+    request = {
+        "command": args.command,
+        "odds_file": str(args.odds_file.resolve()),
+        "bets_file": str(args.bets_file.resolve()),
+        "threshold": getattr(args, "threshold", 0.05),
+        "top": getattr(args, "top", None),
+        "offset": getattr(args, "offset", 0),
+        "limit": getattr(args, "limit", None),
+    }
+    output = query(sock, request)
+    if output is None:
+        return False
+    print(output, end="")
+    return True
+
+
+def _run_reports(args: argparse.Namespace) -> None:
+    if getattr(args, "top", None) is not None and args.top < 1:
+        raise SystemExit("--top must be at least 1")
+    if _ask_daemon(args):
+        return
+    try:  # support running as a module or a script
+        from .odds_aggregate import incremental_aggregate
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from odds_aggregate import incremental_aggregate
+
+    if not args.odds_file.exists():
+        agg = aggregate_odds(())
+    else:
+        agg = incremental_aggregate(args.odds_file, workers=args.workers, checkpoint=not args.no_cache)
+    print(render_reports(agg, args.command, getattr(args, "threshold", 0.05), getattr(args, "top", None)), end="")
+
+
+def _run_api(args: argparse.Namespace) -> None:
+    import asyncio
+
+    try:  # support running as a module or a script
+        from . import odds_api
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        import odds_api
+
+    if not args.api_key:
+        raise SystemExit(f"{args.command} needs --api-key or ODDS_API_KEY")
+    sports = args.sports.split(",") if args.sports else odds_api.DEFAULT_SPORTS
+    regions = args.regions.split(",") if args.regions else odds_api.DEFAULT_REGIONS
+    markets = args.markets.split(",") if args.markets else odds_api.DEFAULT_MARKETS
+    base_url = args.base_url or odds_api.ODDS_API_URL
+    cache_dir = args.cache_dir or args.odds_file.with_name(API_CACHE_DIR)
+    if args.command == "fetch":
+        # Rows of unchanged payloads were appended by the run that fetched them.
+        cache = None if args.no_cache else odds_api.ResponseCache(cache_dir, args.cache_ttl, keep_bodies=False)
+        try:
+            with odds_api.RowAppender(args.odds_file, dedupe=not args.keep_duplicates) as appender:
+                result = odds_api.fetch_odds(
+                    args.api_key,
+                    sports=sports,
+                    regions=regions,
+                    markets=markets,
+                    base_url=base_url,
+                    cache=cache,
+                    on_rows=appender.write,
+                )
+        except odds_api.OddsAPIError as exc:
+            raise SystemExit(f"Error: {exc.status} {exc.body.decode('utf-8', 'replace')}")
+        except (OSError, EOFError, ValueError, asyncio.TimeoutError) as exc:  # network failure or bad response
+            raise SystemExit(f"Error: {exc}")
+        print(
+            f"Received {result.events} events, appended {appender.appended} rows"
+            f" ({result.unchanged} responses unchanged)"
+        )
+        return
+
+    import time
+
+    try:  # support running as a module or a script
+        from .odds_aggregate import incremental_aggregate
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from odds_aggregate import incremental_aggregate
+
+    poller = odds_api.OddsPoller(
+        args.api_key,
+        args.odds_file,
+        sports,
+        regions,
+        markets,
+        base_url,
+        max_rate=args.max_rate / 60,
+        quota_period=args.quota_days * 24 * 3600,
+        discovery_interval=args.discovery_minutes * 60,
+        # Polls are scheduled explicitly, so only revalidate.
+        cache=None if args.no_cache else odds_api.ResponseCache(cache_dir, ttl=0, keep_bodies=False),
+        dedupe=not args.keep_duplicates,
+    )
+    if args.odds_file.exists():
+        now = time.time()
+        for fight in incremental_aggregate(args.odds_file).fights():
+            if fight["time"] is not None:
+                poller.track(fight["event_id"], fight["time"].timestamp(), now)
+    try:
+        asyncio.run(poller.run(args.cycles))
+    except KeyboardInterrupt:
+        pass
+
+
+def _run_compact(args: argparse.Namespace) -> None:
+    try:  # support running as a module or a script
+        from .odds_dedupe import compact_odds
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from odds_dedupe import compact_odds
+
+    if not args.odds_file.exists():
+        raise SystemExit(f"{args.odds_file} does not exist")
+    kept, total = compact_odds(args.odds_file)
+    print(f"Kept {kept} of {total} rows")
+
+
+def _run_bets(args: argparse.Namespace) -> None:
+    try:  # support running as a module or a script
+        from .bet_tracker import Bet, BetTracker, CSVBetStore
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from bet_tracker import Bet, BetTracker, CSVBetStore
+
+    if args.command == "summary":
+        if args.offset < 0 or (args.limit is not None and args.limit < 0):
+            raise SystemExit("--offset and --limit must not be negative")
+        if not _ask_daemon(args):
+            print(render_summary(BetTracker(args.bets_file), args.offset, args.limit), end="")
+        return
+    tracker = BetTracker(args.bets_file, write_only=True)
+    if args.command == "add-bet":
         bet = Bet(
             datetime.now(),
             args.fighter,
@@ -165,13 +376,90 @@ def main() -> None:
             args.result,
             args.payout,
         )
-        tracker.add_bet(bet)
+        try:
+            tracker.add_bet(bet)
+        except ValueError as exc:  # not a bets CSV
+            raise SystemExit(str(exc))
         print("Bet added")
-    elif args.command == "summary":
-        tracker = BetTracker(args.bets_file)
-        _print_table(tracker.summary())
+        return
+
+    import time
+
+    if not args.source.exists():
+        raise SystemExit(f"{args.source} does not exist")
+    if args.source.resolve() == args.bets_file.resolve():
+        raise SystemExit("cannot import the bets file into itself")
+    start = time.perf_counter()
+    try:
+        count = tracker.add_bets(CSVBetStore(args.source))
+    except (KeyError, ValueError) as exc:  # missing column or unparsable value
+        raise SystemExit(f"cannot import {args.source}: {exc!r}; nothing was added")
+    elapsed = time.perf_counter() - start
+    print(f"Imported {count} bets in {elapsed:.2f} s ({count / max(elapsed, 1e-9):.0f} bets/s)")
+
+
+def _run_migrate(args: argparse.Namespace) -> None:
+    try:  # support running as a module or a script
+        from .bet_tracker import migrate_csv_to_sqlite
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from bet_tracker import migrate_csv_to_sqlite
+
+    if not args.bets_file.exists():
+        raise SystemExit(f"{args.bets_file} does not exist")
+    try:
+        copied = migrate_csv_to_sqlite(args.bets_file, args.database)
+    except ValueError as exc:
+        raise SystemExit(str(exc))
+    print(f"Copied {copied} bets to {args.database}; use --bets-file {args.database} from now on")
+
+
+def _run_serve(args: argparse.Namespace) -> None:
+    import asyncio
+
+    try:  # support running as a module or a script
+        from .odds_daemon import QueryHandler, WarmState, serve, socket_path
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from odds_daemon import QueryHandler, WarmState, serve, socket_path
+
+    state = WarmState(args.odds_file, args.bets_file, workers=args.workers)
+    handler = QueryHandler(state, render_reports, render_summary)
+    sock = socket_path(args.odds_file)
+    http = None
+    if args.http_port is not None:
+        try:  # support running as a module or a script
+            from .odds_http import HTTPHandler
+        except ImportError:  # pragma: no cover - fallback when executed as a script
+            from odds_http import HTTPHandler
+
+        http = HTTPHandler(state)
+        print(f"JSON API on http://{args.http_host}:{args.http_port}/")
+    print(f"Serving {args.odds_file} and {args.bets_file} on {sock}")
+    try:
+        asyncio.run(serve(handler, sock, http, (args.http_host, args.http_port)))
+    except KeyboardInterrupt:
+        pass
+
+
+_COMMANDS = {
+    "fights": _run_reports,
+    "best": _run_reports,
+    "value": _run_reports,
+    "report": _run_reports,
+    "fetch": _run_api,
+    "poll": _run_api,
+    "compact": _run_compact,
+    "add-bet": _run_bets,
+    "import-bets": _run_bets,
+    "summary": _run_bets,
+    "migrate-bets": _run_migrate,
+    "serve": _run_serve,
+}
+
+
+def main() -> None:
+    args = _parse_args()
+    _COMMANDS[args.command](args)
 
 
 if __name__ == "__main__":  # pragma: no cover
     main()
-
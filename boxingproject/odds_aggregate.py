@@ -0,0 +1,459 @@
+"""Single-pass aggregation of odds rows for the fights/best/value reports."""
+from __future__ import annotations
+
+import csv
+import heapq
+import math
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+try:  # support running as a module or a script
+    from .odds_store import (
+        OddsRecord, OddsTable, Vocabulary, cached_table, load_table, pack_key, record_parser, to_datetime,
+        unpack_key,
+    )
+    from .sidecar import covers_prefix, digest_before, read_state, write_state
+except ImportError:  # pragma: no cover - fallback when executed as a script
+    from odds_store import (
+        OddsRecord, OddsTable, Vocabulary, cached_table, load_table, pack_key, record_parser, to_datetime,
+        unpack_key,
+    )
+    from sidecar import covers_prefix, digest_before, read_state, write_state
+
+# Field positions in the per-(event, fighter) state lists.
+SUM, COMP, COUNT, BEST, BOOKMAKER, TIME = range(6)
+# Relative error bound, with a wide safety factor, of a float mean of sum and
+# compensation against the correctly rounded one (a few ulps, ~1e-15).
+_MEAN_ERROR = 1e-12
+
+
+class OddsAggregate:
+    """Per-event and per-(event, fighter) summaries of a set of odds rows.
+
+    ``first_time`` maps event codes to their earliest time and ``groups``
+    maps packed ``(event code, fighter code)`` keys (see
+    :func:`~odds_store.pack_key`) to ``[sum, compensation, count, best odds,
+    best bookmaker code, time of best row]``.  Memory is proportional to the
+    number of groups, not rows.  Sums are Neumaier compensated so that
+    dividing them exactly matches ``statistics.mean``.
+
+    The value ranking used by :meth:`value` is built on first use and kept
+    until the aggregate changes, so sweeping thresholds costs a binary
+    search per call.
+    """
+
+    def __init__(
+        self,
+        events: Vocabulary | None = None,
+        fighters: Vocabulary | None = None,
+        bookmakers: Vocabulary | None = None,
+    ) -> None:
+        self.events = events if events is not None else Vocabulary()
+        self.fighters = fighters if fighters is not None else Vocabulary()
+        self.bookmakers = bookmakers if bookmakers is not None else Vocabulary()
+        self.first_time: Dict[int, int] = {}
+        self.groups: Dict[int, list] = {}
+        self._ranking: Tuple[List[float], List[float], List[dict]] | None = None
+
+    def add(self, event: int, fighter: int, bookmaker: int, odds: float, time: int) -> None:
+        """Fold one encoded row into the aggregate."""
+        self._ranking = None
+        first = self.first_time.get(event)
+        if first is None or time < first:
+            self.first_time[event] = time
+        key = event << 32 | fighter
+        g = self.groups.get(key)
+        if g is None:
+            self.groups[key] = [odds, 0.0, 1, odds, bookmaker, time]
+            return
+        s = g[SUM]
+        t = s + odds
+        g[COMP] += (s - t) + odds if abs(s) >= abs(odds) else (odds - t) + s
+        g[SUM] = t
+        g[COUNT] += 1
+        if odds > g[BEST]:
+            g[BEST] = odds
+            g[BOOKMAKER] = bookmaker
+            g[TIME] = time
+
+    def add_records(self, records: Iterable[OddsRecord]) -> None:
+        """Encode and fold records into the aggregate."""
+        encode_event = self.events.encode
+        encode_fighter = self.fighters.encode
+        encode_bookmaker = self.bookmakers.encode
+        add = self.add
+        for event_id, time, fighter, bookmaker, odds in records:
+            add(encode_event(event_id), encode_fighter(fighter), encode_bookmaker(bookmaker), odds, time)
+
+    @classmethod
+    def from_table(cls, table: OddsTable) -> "OddsAggregate":
+        """Aggregate every row of ``table`` in one pass.
+
+        The aggregate shares the table's vocabularies.  NumPy is imported
+        here rather than at module load, so streaming callers never pay for it.
+        """
+        try:  # support running as a module or a script
+            from . import odds_numpy
+        except ImportError:  # pragma: no cover - fallback when executed as a script
+            import odds_numpy
+
+        agg = cls(table.events, table.fighters, table.bookmakers)
+        if odds_numpy.available():
+            agg._fill_numpy(table, odds_numpy)
+            return agg
+        add = agg.add
+        for args in zip(table.event_codes, table.fighter_codes, table.bookmaker_codes, table.odds, table.times):
+            add(*args)
+        return agg
+
+    @classmethod
+    def from_records(cls, records: Iterable[OddsRecord]) -> "OddsAggregate":
+        """Aggregate any iterable of records, holding only per-group state.
+
+        An :class:`OddsTable` takes the columnar fast path.
+        """
+        if isinstance(records, OddsTable):
+            return cls.from_table(records)
+        agg = cls()
+        agg.add_records(records)
+        return agg
+
+    def merge(self, other: "OddsAggregate") -> None:
+        """Fold ``other``, aggregated from later rows, into this aggregate."""
+        self._ranking = None
+        # Translate the other aggregate's codes into this one's vocabulary.
+        events = [self.events.encode(v) for v in other.events]
+        fighters = [self.fighters.encode(v) for v in other.fighters]
+        bookmakers = [self.bookmakers.encode(v) for v in other.bookmakers]
+        for event, time in other.first_time.items():
+            event = events[event]
+            first = self.first_time.get(event)
+            if first is None or time < first:
+                self.first_time[event] = time
+        for key, g in other.groups.items():
+            event, fighter = unpack_key(key)
+            key = pack_key(events[event], fighters[fighter])
+            mine = self.groups.get(key)
+            if mine is None:
+                self.groups[key] = [g[SUM], g[COMP], g[COUNT], g[BEST], bookmakers[g[BOOKMAKER]], g[TIME]]
+                continue
+            s, x = mine[SUM], g[SUM]
+            t = s + x
+            mine[COMP] += g[COMP] + ((s - t) + x if abs(s) >= abs(x) else (x - t) + s)
+            mine[SUM] = t
+            mine[COUNT] += g[COUNT]
+            if g[BEST] > mine[BEST]:
+                mine[BEST] = g[BEST]
+                mine[BOOKMAKER] = bookmakers[g[BOOKMAKER]]
+                mine[TIME] = g[TIME]
+
+    def to_state(self) -> dict:
+        """Return a JSON-serialisable snapshot of the aggregate."""
+        return {
+            "events": self.events.values,
+            "fighters": self.fighters.values,
+            "bookmakers": self.bookmakers.values,
+            "first_time": list(self.first_time.items()),
+            "groups": [[*unpack_key(key), *g] for key, g in self.groups.items()],
+        }
+
+    @classmethod
+    def from_state(cls, state: dict) -> "OddsAggregate":
+        """Rebuild an aggregate from :meth:`to_state` output."""
+        agg = cls(Vocabulary(state["events"]), Vocabulary(state["fighters"]), Vocabulary(state["bookmakers"]))
+        agg.first_time = {event: time for event, time in state["first_time"]}
+        agg.groups = {pack_key(g[0], g[1]): g[2:] for g in state["groups"]}
+        return agg
+
+    def _fill_numpy(self, table: OddsTable, odds_numpy) -> None:
+        self._ranking = None
+        best_rows, sums, comps, counts = odds_numpy.group_reduce(table)
+        self.first_time = dict(enumerate(odds_numpy.event_first_times(table).tolist()))
+        ev, fi, bk = table.event_codes, table.fighter_codes, table.bookmaker_codes
+        odds, times = table.odds, table.times
+        for i, s, c, n in zip(best_rows.tolist(), sums.tolist(), comps.tolist(), counts.tolist()):
+            self.groups[pack_key(ev[i], fi[i])] = [s, c, n, odds[i], bk[i], times[i]]
+
+    def fights(self) -> List[dict]:
+        """Return events sorted by earliest available time."""
+        first = self.first_time
+        return [
+            {"event_id": self.events[code], "time": to_datetime(first[code])}
+            for code in sorted(first, key=first.get)
+        ]
+
+    def best(self) -> List[dict]:
+        """Return the best odds for each fighter in every event."""
+        return [
+            {
+                "event_id": self.events[key >> 32],
+                "time": to_datetime(g[TIME]),
+                "fighter": self.fighters[key & 0xFFFFFFFF],
+                "bookmaker": self.bookmakers[g[BOOKMAKER]],
+                "decimal_odds": g[BEST],
+            }
+            for key, g in self.groups.items()
+        ]
+
+    def _value_row(self, key: int, g: list, avg_odds: float, value_pct: float) -> dict:
+        return {
+            "event_id": self.events[key >> 32],
+            "time": to_datetime(g[TIME]),
+            "fighter": self.fighters[key & 0xFFFFFFFF],
+            "bookmaker": self.bookmakers[g[BOOKMAKER]],
+            "avg_odds": round(avg_odds, 2),
+            "best_odds": g[BEST],
+            "value_pct": round(value_pct, 2),
+        }
+
+    def _exact_values(self, g: list) -> Tuple[float, float]:
+        """Return ``(avg_odds, value_pct)`` from the exact mean of the group's sums."""
+        from fractions import Fraction  # pulls in decimal; only needed near rounding boundaries
+
+        avg_odds = float((Fraction(g[SUM]) + Fraction(g[COMP])) / g[COUNT])
+        return avg_odds, (g[BEST] - avg_odds) / avg_odds
+
+    def _values(self, threshold: float | None = None) -> Iterator[Tuple[int, list, float, float, float]]:
+        """Yield ``(key, group, avg_odds, value_pct, margin)`` for every group.
+
+        The mean is taken in floating point, which can be a few ulps off the
+        correctly rounded mean of sum and compensation.  Where that could
+        change the 2 dp rounding of avg_odds or value_pct, or which side of
+        ``threshold`` value_pct falls on, both are recomputed exactly and
+        ``margin`` is 0; otherwise ``margin`` bounds the error of value_pct.
+        """
+        error = _MEAN_ERROR
+        near = math.nan if threshold is None else threshold  # nan is never within the margin
+        for key, g in self.groups.items():
+            best = g[BEST]
+            avg_odds = (g[SUM] + g[COMP]) / g[COUNT]
+            if avg_odds > 0 and best > 0:
+                value_pct = (best - avg_odds) / avg_odds
+                margin = error * (1 + abs(value_pct))
+                # x % 1.0 is the distance past the last hundredth; nan (overflow) fails every test.
+                a, p = avg_odds * 100 % 1.0, value_pct * 100 % 1.0
+                if (
+                    abs(a - 0.5) > error * avg_odds * 100
+                    and abs(p - 0.5) > margin * 100
+                    and not abs(value_pct - near) <= margin
+                ):
+                    yield key, g, avg_odds, value_pct, margin
+                    continue
+            yield (key, g, *self._exact_values(g), 0.0)
+
+    def _at_least(self, pct: float, margin: float, key: int, threshold: float) -> bool:
+        """Return whether a ranked row's exact value_pct reaches ``threshold``."""
+        if not abs(pct - threshold) <= margin:
+            return pct >= threshold
+        return self._exact_values(self.groups[key])[1] >= threshold
+
+    def _value_ranking(self) -> Tuple[List[float], List[tuple], List[dict]]:
+        """Return every group's value row in report order, building it once.
+
+        The result is ``(keys, pcts, rows)``: ``keys`` holds the negated
+        rounded value_pct each row is ordered by (ascending, for bisect),
+        and ``pcts`` the ``(value_pct, margin, group key)`` the threshold is
+        checked against with :meth:`_at_least`.
+        """
+        if self._ranking is not None:
+            return self._ranking
+        entries = []
+        for key, g, avg_odds, value_pct, margin in self._values():
+            row = self._value_row(key, g, avg_odds, value_pct)
+            entries.append((-row["value_pct"], (value_pct, margin, key), row))
+        entries.sort(key=lambda e: e[0])  # stable: ties stay in group order
+        self._ranking = ([e[0] for e in entries], [e[1] for e in entries], [e[2] for e in entries])
+        return self._ranking
+
+    def value(self, threshold: float = 0.05, top: int | None = None) -> List[dict]:
+        """Return groups whose best odds exceed the average by ``threshold``.
+
+        Rows are sorted by rounded value_pct, highest first.  Rounding is
+        monotonic, so every row rounding above ``round(threshold, 2)``
+        qualifies and every row rounding below it does not; only rows in
+        the bucket equal to it are compared with ``threshold`` itself.
+
+        With ``top`` only the first ``top`` rows are returned.  If the
+        ranking has not been built they are picked with a bounded heap, so
+        only ``top`` candidates are held and nothing else is sorted.
+        """
+        if top is not None and self._ranking is None:
+            return self._top_values(threshold, top)
+        keys, pcts, rows = self._value_ranking()
+        limit = len(rows) if top is None else max(top, 0)
+        if not math.isfinite(threshold):
+            matching = (row for pct, row in zip(pcts, rows) if self._at_least(*pct, threshold))
+            selected = list(islice(matching, limit))
+        else:
+            bucket = -round(threshold, 2)
+            lo, hi = bisect_left(keys, bucket), bisect_right(keys, bucket)
+            selected = rows[:min(lo, limit)]
+            if len(selected) < limit:
+                matching = (rows[i] for i in range(lo, hi) if self._at_least(*pcts[i], threshold))
+                selected += islice(matching, limit - len(selected))
+        return [dict(row) for row in selected]
+
+    def _top_values(self, threshold: float, top: int) -> List[dict]:
+        candidates = (
+            (-round(value_pct, 2), i, key, g, avg_odds, value_pct)
+            for i, (key, g, avg_odds, value_pct, _) in enumerate(self._values(threshold))
+            if value_pct >= threshold
+        )
+        # The index breaks ties so equal rows keep group order, as in value().
+        best = heapq.nsmallest(top, candidates, key=lambda c: c[:2])
+        return [self._value_row(*c[2:]) for c in best]
+
+
+# Incremental checkpoints
+# -----------------------
+# The scraper only ever appends to the odds file, so the aggregate of the
+# bytes read so far is stored next to it together with the byte offset and a
+# digest of the bytes just before that offset.  A later run verifies the
+# digest, then parses only what was appended.  Truncated or rewritten files
+# fail the check and are re-read from the start: through the binary cache
+# and the columnar (NumPy when available) path of OddsAggregate.from_table
+# when the cache is current or the file is small enough to hold in memory,
+# otherwise streamed in constant memory.
+
+CHECKPOINT_SUFFIX = ".ckpt"
+_CHECKPOINT_VERSION = 1
+# Larger files without a current binary cache are streamed, not loaded.
+_TABLE_MAX_BYTES = 256 << 20
+# Below this many unread bytes a process pool costs more than it saves.
+_PARALLEL_MIN_BYTES = 1 << 20
+
+
+def checkpoint_path(path: Path) -> Path:
+    """Return the checkpoint path used for odds CSV ``path``."""
+    return path.with_name(path.name + CHECKPOINT_SUFFIX)
+
+
+def _last_line_end(f: BinaryIO, start: int, size: int) -> int:
+    """Return the offset just past the last newline in ``[start, size)``."""
+    pos = size
+    while pos > start:
+        block = max(start, pos - 65536)
+        f.seek(block)
+        nl = f.read(pos - block).rfind(b"\n")
+        if nl >= 0:
+            return block + nl + 1
+        pos = block
+    return start
+
+
+def _split_ranges(f: BinaryIO, start: int, end: int, parts: int) -> List[Tuple[int, int]]:
+    """Split ``[start, end)`` into up to ``parts`` ranges on line boundaries.
+
+    Odds rows never contain quoted newlines, so every newline is a row end.
+    """
+    bounds = [start]
+    for i in range(1, parts):
+        f.seek(start + (end - start) * i // parts)
+        f.readline()
+        pos = min(f.tell(), end)
+        if pos > bounds[-1]:
+            bounds.append(pos)
+    if end > bounds[-1]:
+        bounds.append(end)
+    return list(zip(bounds, bounds[1:]))
+
+
+def _range_lines(f: BinaryIO, start: int, end: int) -> Iterator[str]:
+    f.seek(start)
+    pos = start
+    for line in f:
+        yield line.decode("utf-8")
+        pos += len(line)
+        if pos >= end:
+            return
+
+
+def _add_range(agg: OddsAggregate, f: BinaryIO, header: List[str], start: int, end: int) -> None:
+    parse = record_parser(header)
+    agg.add_records(parse(rec) for rec in csv.reader(_range_lines(f, start, end)) if rec)
+
+
+def _aggregate_range(path: Path, header: List[str], start: int, end: int) -> dict:
+    """Worker entry point: aggregate one byte range of ``path``."""
+    agg = OddsAggregate()
+    with path.open("rb") as f:
+        _add_range(agg, f, header, start, end)
+    return agg.to_state()
+
+
+def _add_parallel(
+    agg: OddsAggregate, f: BinaryIO, path: Path, header: List[str], start: int, end: int, workers: int
+) -> None:
+    from concurrent.futures import ProcessPoolExecutor
+
+    ranges = _split_ranges(f, start, end, workers)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_aggregate_range, path, header, a, b) for a, b in ranges]
+        for future in futures:  # merge in file order so ties resolve as in a serial pass
+            agg.merge(OddsAggregate.from_state(future.result()))
+
+
+def incremental_aggregate(path: Path, workers: int = 1, checkpoint: bool = True) -> OddsAggregate:
+    """Aggregate ``path``, parsing only bytes appended since the last call.
+
+    Without a usable checkpoint the whole file is aggregated by
+    :meth:`OddsAggregate.from_table` if its binary cache is current or it
+    is at most ``_TABLE_MAX_BYTES``; larger files are streamed.  With
+    ``workers > 1`` large unread regions are instead split at line
+    boundaries and parsed in a process pool, and the partial aggregates are
+    merged.  ``checkpoint=False`` ignores and does not update the stored
+    checkpoint or binary cache, and streams the file in constant memory.
+    """
+    ckpt = checkpoint_path(path)
+    state = read_state(ckpt, _CHECKPOINT_VERSION) if checkpoint else None
+    size = path.stat().st_size
+    with path.open("rb") as f:
+        if state is not None and covers_prefix(f, state, size):
+            agg = OddsAggregate.from_state(state["aggregate"])
+            header = state["header"]
+            start = state["offset"]
+            changed = False
+        else:
+            agg = OddsAggregate()
+            f.seek(0)
+            first = f.readline()
+            if not first.endswith(b"\n"):
+                return agg
+            header = next(csv.reader([first.decode("utf-8")]))
+            start = len(first)
+            changed = True
+            f.seek(size - 1)
+            if checkpoint and workers <= 1 and f.read(1) == b"\n":  # no row is being written
+                table = cached_table(path)
+                if table is None and size <= _TABLE_MAX_BYTES:
+                    table = load_table(path)
+                if table is not None and path.stat().st_size == size:  # else rows were appended; stream
+                    agg = OddsAggregate.from_table(table)
+                    start = size
+        # Rows after the last newline may still be being written.
+        end = _last_line_end(f, start, size)
+        if workers > 1 and end - start >= _PARALLEL_MIN_BYTES:
+            _add_parallel(agg, f, path, header, start, end, workers)
+        elif end > start:
+            _add_range(agg, f, header, start, end)
+        if checkpoint and (changed or end != start):
+            state = {
+                "version": _CHECKPOINT_VERSION,
+                "offset": end,
+                "digest": digest_before(f, end),
+                "header": header,
+                "aggregate": agg.to_state(),
+            }
+            write_state(ckpt, state)
+        f.seek(end)
+        tail = f.read(size - end)
+    if tail.strip():
+        parse = record_parser(header)
+        try:
+            rows = [parse(rec) for rec in csv.reader([tail.decode("utf-8")]) if rec]
+        except (IndexError, ValueError):
+            rows = []  # a row still being written
+        agg.add_records(rows)
+    return agg
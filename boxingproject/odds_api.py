@@ -0,0 +1,830 @@
+"""Asynchronous client for the-odds-api using only the standard library.
+
+Requests for every sport/region/market combination are issued concurrently
+over a small pool of keep-alive connections, so a full sweep takes about as
+long as its slowest request.  Responses are flattened into rows matching the
+``boxing_odds.csv`` schema read by :func:`boxing_app.load_odds`.
+
+Cron jobs import this module on every run, so only cheap modules are
+imported at load time.  ``asyncio``, ``ssl``, ``json`` and the CSV helpers
+are imported by the code paths that use them; ``tools/startup_budget.py``
+checks the cost of ``import odds_api``.
+"""
+from __future__ import annotations
+
+import os
+import time
+from contextlib import asynccontextmanager
+from itertools import product
+from pathlib import Path
+from typing import (
+    TYPE_CHECKING, AsyncIterator, BinaryIO, Callable, Dict, Iterable, List, NamedTuple, Sequence, Tuple,
+)
+from urllib.parse import urlencode, urlsplit
+
+if TYPE_CHECKING:  # pragma: no cover
+    import asyncio
+    import ssl
+
+ODDS_API_URL = "https://api.the-odds-api.com/v4"
+ODDS_COLUMNS = ["event_id", "time", "fighter", "decimal_odds", "bookmaker", "implied_prob"]
+DEFAULT_SPORTS = ("boxing_boxing",)
+DEFAULT_REGIONS = ("us", "uk", "eu")
+DEFAULT_MARKETS = ("h2h",)
+
+
+class OddsAPIError(Exception):
+    """Raised when the odds API answers with an unexpected status."""
+
+    def __init__(self, status: int, body: bytes) -> None:
+        super().__init__(f"odds API returned HTTP {status}: {body[:200]!r}")
+        self.status = status
+        self.body = body
+
+
+class Response(NamedTuple):
+    status: int
+    headers: Dict[str, str]  # lower-cased names
+    body: bytes
+
+
+_Conn = Tuple["asyncio.StreamReader", "asyncio.StreamWriter"]
+
+
+class HTTPClient:
+    """Minimal asyncio HTTP/1.1 client with per-host keep-alive pooling."""
+
+    def __init__(self, max_per_host: int = 8, timeout: float = 30.0) -> None:
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self._idle: Dict[tuple, List[_Conn]] = {}
+        self._limits: Dict[tuple, asyncio.Semaphore] = {}
+        self._ssl: ssl.SSLContext | None = None
+
+    async def __aenter__(self) -> "HTTPClient":
+        return self
+
+    async def __aexit__(self, *exc: object) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """Close all idle pooled connections."""
+        for conns in self._idle.values():
+            for _, writer in conns:
+                writer.close()
+        self._idle.clear()
+
+    async def _connect(self, key: tuple) -> _Conn:
+        import asyncio
+
+        scheme, host, port = key
+        context = None
+        if scheme == "https":
+            if self._ssl is None:
+                import ssl
+
+                self._ssl = ssl.create_default_context()
+            context = self._ssl
+        return await asyncio.open_connection(host, port, ssl=context)
+
+    @asynccontextmanager
+    async def stream(
+        self, url: str, params: Dict[str, str] | None = None, headers: Dict[str, str] | None = None
+    ) -> AsyncIterator["StreamingResponse"]:
+        """Send a GET request and yield the response before its body is read.
+
+        The connection returns to the pool only if the body was consumed.
+        """
+        import asyncio
+
+        parts = urlsplit(url)
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        key = (parts.scheme, parts.hostname, port)
+        target = parts.path or "/"
+        query = "&".join(q for q in (parts.query, urlencode(params or {})) if q)
+        if query:
+            target += "?" + query
+        lines = [f"GET {target} HTTP/1.1", f"Host: {parts.netloc}", "Accept-Encoding: identity"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        request = ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+        limit = self._limits.setdefault(key, asyncio.Semaphore(self.max_per_host))
+        async with limit:
+            idle = self._idle.setdefault(key, [])
+            while True:
+                reused = bool(idle)
+                conn = idle.pop() if reused else await self._connect(key)
+                try:
+                    response = await asyncio.wait_for(self._send(conn, request), self.timeout)
+                except (ConnectionError, asyncio.IncompleteReadError):
+                    conn[1].close()
+                    if reused:  # the server dropped an idle connection; retry on a fresh one
+                        continue
+                    raise
+                except BaseException:
+                    conn[1].close()
+                    raise
+                break
+            try:
+                yield response
+            finally:
+                if response.keep_alive and response.consumed:
+                    idle.append(conn)
+                else:
+                    conn[1].close()
+
+    async def get(
+        self, url: str, params: Dict[str, str] | None = None, headers: Dict[str, str] | None = None
+    ) -> Response:
+        """Send a GET request and return the complete response."""
+        async with self.stream(url, params, headers) as response:
+            return Response(response.status, response.headers, await response.read())
+
+    async def _send(self, conn: _Conn, request: bytes) -> "StreamingResponse":
+        reader, writer = conn
+        writer.write(request)
+        await writer.drain()
+        status_line = await reader.readline()
+        if not status_line:
+            raise ConnectionResetError("connection closed before response")
+        version, status = status_line.split(None, 2)[:2]
+        headers: Dict[str, str] = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = version == b"HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        return StreamingResponse(int(status), headers, reader, keep_alive, self.timeout)
+
+
+class StreamingResponse:
+    """Response whose body is read incrementally with :meth:`iter_chunks`."""
+
+    def __init__(
+        self, status: int, headers: Dict[str, str], reader: asyncio.StreamReader, keep_alive: bool, timeout: float
+    ) -> None:
+        self.status = status
+        self.headers = headers
+        self.keep_alive = keep_alive
+        self.consumed = False
+        self._reader = reader
+        self._timeout = timeout
+
+    async def _read(self, op) -> bytes:
+        import asyncio
+
+        return await asyncio.wait_for(op, self._timeout)
+
+    async def iter_chunks(self, size: int = 65536) -> AsyncIterator[bytes]:
+        """Yield the body in pieces as they arrive from the network."""
+        from asyncio import IncompleteReadError
+
+        reader = self._reader
+        if self.status in (204, 304) or 100 <= self.status < 200:
+            pass
+        elif self.headers.get("transfer-encoding", "").lower() == "chunked":
+            while True:
+                length = int((await self._read(reader.readline())).split(b";")[0], 16)
+                if length == 0:
+                    while (await self._read(reader.readline())) not in (b"\r\n", b"\n", b""):
+                        pass  # trailers
+                    break
+                while length:
+                    chunk = await self._read(reader.read(min(size, length)))
+                    if not chunk:
+                        raise IncompleteReadError(chunk, length)
+                    length -= len(chunk)
+                    yield chunk
+                await self._read(reader.readexactly(2))
+        elif "content-length" in self.headers:
+            length = int(self.headers["content-length"])
+            while length:
+                chunk = await self._read(reader.read(min(size, length)))
+                if not chunk:
+                    raise IncompleteReadError(chunk, length)
+                length -= len(chunk)
+                yield chunk
+        else:
+            self.keep_alive = False
+            while chunk := await self._read(reader.read(size)):
+                yield chunk
+        self.consumed = True
+
+    async def read(self) -> bytes:
+        """Return the whole body."""
+        return b"".join([chunk async for chunk in self.iter_chunks()])
+
+
+class EventStream:
+    """Incremental parser for a JSON array of event objects.
+
+    Bytes are fed as they arrive and each event is returned as soon as its
+    closing brace has been received, so only one event is held in memory
+    at a time rather than the whole response tree.
+    """
+
+    def __init__(self) -> None:
+        import codecs
+        import json
+
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._started = False
+        self._finished = False
+
+    def feed(self, data: bytes) -> List[dict]:
+        """Consume ``data`` and return the events completed by it."""
+        self._buf += self._text.decode(data)
+        events = []
+        buf = self._buf
+        pos = 0
+        while not self._finished:
+            while pos < len(buf) and buf[pos] in " \t\r\n,":
+                pos += 1
+            if pos == len(buf):
+                break
+            if not self._started:
+                if buf[pos] != "[":
+                    raise ValueError("odds API response is not a JSON array")
+                self._started = True
+                pos += 1
+                continue
+            if buf[pos] == "]":
+                self._finished = True
+                pos += 1
+                break
+            try:
+                event, end = self._decoder.raw_decode(buf, pos)
+            except ValueError:  # json.JSONDecodeError
+                break  # incomplete; wait for more bytes
+            events.append(event)
+            pos = end
+        self._buf = buf[pos:]
+        return events
+
+    def close(self) -> None:
+        """Check that the array was complete."""
+        if not self._finished:
+            raise ValueError("odds API response ended before the JSON array closed")
+
+
+class ResponseCache:
+    """On-disk cache of API responses keyed by URL and query parameters.
+
+    Entries younger than ``ttl`` seconds are served without touching the
+    network.  Older entries are revalidated with ``If-None-Match`` /
+    ``If-Modified-Since`` so an unchanged payload costs a 304 instead of a
+    full transfer.  The API key is left out of the cache key.
+
+    With ``keep_bodies`` the payload is stored too and replayed for fresh
+    or unchanged entries, so callers still receive every row.  Without it
+    only the validators are kept and unchanged payloads yield no rows,
+    which suits callers that already appended them.
+    """
+
+    def __init__(self, directory: Path, ttl: float = 60.0, keep_bodies: bool = True) -> None:
+        self.directory = Path(directory)
+        self.ttl = ttl
+        self.keep_bodies = keep_bodies
+
+    def _key(self, url: str, params: Dict[str, str]) -> str:
+        import hashlib
+
+        query = urlencode(sorted((k, v) for k, v in params.items() if k != "apiKey"))
+        return hashlib.sha256(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+    def _paths(self, key: str) -> Tuple[Path, Path]:
+        return self.directory / f"{key}.json", self.directory / f"{key}.body"
+
+    def lookup(self, url: str, params: Dict[str, str]) -> dict | None:
+        """Return the stored metadata for a request, or None."""
+        import json
+
+        meta_path, _ = self._paths(self._key(url, params))
+        try:
+            with meta_path.open() as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def is_fresh(self, meta: dict) -> bool:
+        return time.time() - meta["fetched_at"] < self.ttl
+
+    def validators(self, meta: dict) -> Dict[str, str]:
+        """Return conditional request headers for a stored entry."""
+        headers = {}
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def body(self, url: str, params: Dict[str, str]) -> bytes | None:
+        """Return the cached body for a request, or None."""
+        _, body_path = self._paths(self._key(url, params))
+        try:
+            return body_path.read_bytes()
+        except OSError:
+            return None
+
+    def body_writer(self, url: str, params: Dict[str, str]) -> BinaryIO | None:
+        """Open a per-process temporary file to receive a body as it streams in."""
+        if not self.keep_bodies:
+            return None
+        _, body_path = self._paths(self._key(url, params))
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            return _temp_path(body_path).open("wb")
+        except OSError:
+            return None
+
+    def store(
+        self, url: str, params: Dict[str, str], response: Response, body_file: BinaryIO | None = None
+    ) -> None:
+        """Record a 200 response, or refresh the timestamp after a 304.
+
+        ``body_file`` is a completed :meth:`body_writer` file holding the
+        body, in which case ``response.body`` is ignored.  It is moved into
+        place, or removed if that fails.
+        """
+        import json
+
+        key = self._key(url, params)
+        meta_path, body_path = self._paths(key)
+        meta = {
+            "url": url,
+            "fetched_at": time.time(),
+            "etag": response.headers.get("etag"),
+            "last_modified": response.headers.get("last-modified"),
+        }
+        try:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if response.status == 304:
+                old = self.lookup(url, params) or {}
+                meta["etag"] = meta["etag"] or old.get("etag")
+                meta["last_modified"] = meta["last_modified"] or old.get("last_modified")
+            elif body_file is not None:
+                body_file.close()
+                os.replace(body_file.name, body_path)
+            elif self.keep_bodies:
+                _atomic_write(body_path, response.body)
+            _atomic_write(meta_path, json.dumps(meta).encode("utf-8"))
+        except OSError:
+            if body_file is not None:
+                _discard(Path(body_file.name))
+            # caching is best effort
+
+
+def _temp_path(path: Path) -> Path:
+    try:  # support running as a module or a script
+        from .sidecar import temp_path
+    except ImportError:  # pragma: no cover - fallback when executed as a script
+        from sidecar import temp_path
+
+    return temp_path(path)
+
+
+def _discard(path: Path) -> None:
+    try:
+        path.unlink(missing_ok=True)
+    except OSError:
+        pass
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    tmp = _temp_path(path)
+    try:
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+    except BaseException:
+        _discard(tmp)
+        raise
+
+
+def _is_event(event: object) -> bool:
+    return (
+        isinstance(event, dict)
+        and isinstance(event.get("id"), str)
+        and isinstance(event.get("commence_time"), str)
+    )
+
+
+def _price(outcome: object) -> float | None:
+    """Return the decimal odds of ``outcome``, or None if they are unusable."""
+    if not isinstance(outcome, dict) or not isinstance(outcome.get("name"), str):
+        return None
+    try:
+        price = float(outcome["price"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    return price if 0 < price < float("inf") else None
+
+
+def parse_events(events: Iterable[dict]) -> List[list]:
+    """Flatten odds API events into rows in the ``boxing_odds.csv`` layout.
+
+    Events without an id or commence time and outcomes without a name or a
+    positive finite price are skipped, so one malformed quote does not cost
+    the rest of the response.
+    """
+    rows: List[list] = []
+    for event in events:
+        if not _is_event(event):
+            continue
+        for bookmaker in event.get("bookmakers") or ():
+            if not isinstance(bookmaker, dict) or not isinstance(bookmaker.get("key"), str):
+                continue
+            for market in bookmaker.get("markets") or ():
+                if not isinstance(market, dict):
+                    continue
+                for outcome in market.get("outcomes") or ():
+                    price = _price(outcome)
+                    if price is None:
+                        continue
+                    rows.append([
+                        event["id"],
+                        event["commence_time"],
+                        outcome["name"],
+                        price,
+                        bookmaker["key"],
+                        1 / price,
+                    ])
+    return rows
+
+
+class FetchResult(NamedTuple):
+    events: int
+    rows: List[list]
+    unchanged: int = 0  # responses served from cache or answered with 304
+    remaining: int | None = None  # lowest x-requests-remaining seen
+
+
+def requests_remaining(headers: Dict[str, str]) -> int | None:
+    """Return the API quota left according to ``x-requests-remaining``."""
+    try:
+        return int(float(headers["x-requests-remaining"]))
+    except (KeyError, ValueError):
+        return None
+
+
+async def fetch_odds_async(
+    api_key: str,
+    sports: Sequence[str] = DEFAULT_SPORTS,
+    regions: Sequence[str] = DEFAULT_REGIONS,
+    markets: Sequence[str] = DEFAULT_MARKETS,
+    base_url: str = ODDS_API_URL,
+    client: HTTPClient | None = None,
+    cache: ResponseCache | None = None,
+    event_ids: Sequence[str] | None = None,
+    on_rows: Callable[[List[list]], object] | None = None,
+) -> FetchResult:
+    """Fetch every sport/region/market combination concurrently.
+
+    Responses are parsed with :class:`EventStream` while they download.
+    With ``on_rows`` each event's rows are handed over as soon as the event
+    has been received and ``FetchResult.rows`` stays empty; otherwise rows
+    are collected.  With a ``cache``, payloads that are still fresh or that
+    the server reports as unchanged are not downloaded again; their rows
+    are replayed from the cached body, or skipped when the cache keeps no
+    bodies.  ``event_ids`` restricts the request to those events; such
+    requests bypass the cache, since every batch names a different set.
+    """
+    quota: List[int] = []
+    seen: set = set()
+    rows: List[list] = []
+    emit = on_rows if on_rows is not None else rows.extend
+    store = None if event_ids else cache
+
+    def replay(body: bytes) -> None:
+        if not body:  # validators only
+            return
+        parser = EventStream()
+        for event in parser.feed(body):
+            if _is_event(event):
+                seen.add(event["id"])
+            emit(parse_events((event,)))
+        parser.close()
+
+    async def fetch_one(http: HTTPClient, sport: str, region: str, market: str) -> bool:
+        url = f"{base_url}/sports/{sport}/odds"
+        params = {"apiKey": api_key, "regions": region, "markets": market, "oddsFormat": "decimal"}
+        if event_ids:
+            params["eventIds"] = ",".join(event_ids)
+        headers = {}
+        body = None
+        if store is not None:
+            meta = store.lookup(url, params)
+            if meta is not None:
+                body = store.body(url, params) if store.keep_bodies else b""
+            if body is not None:  # entries whose body went missing are refetched
+                if store.is_fresh(meta):
+                    replay(body)
+                    return False
+                headers = store.validators(meta)
+        async with http.stream(url, params, headers) as response:
+            remaining = requests_remaining(response.headers)
+            if remaining is not None:
+                quota.append(remaining)
+            if response.status == 304 and body is not None:
+                await response.read()
+                store.store(url, params, Response(304, response.headers, b""))
+                replay(body)
+                return False
+            if response.status != 200:
+                raise OddsAPIError(response.status, await response.read())
+            body_file = store.body_writer(url, params) if store is not None else None
+            parser = EventStream()
+            try:
+                async for chunk in response.iter_chunks():
+                    if body_file is not None:
+                        body_file.write(chunk)
+                    for event in parser.feed(chunk):
+                        if _is_event(event):
+                            seen.add(event["id"])
+                        emit(parse_events((event,)))
+                parser.close()
+            except BaseException:
+                if body_file is not None:
+                    body_file.close()
+                    _discard(Path(body_file.name))
+                raise
+        if store is not None:
+            store.store(url, params, Response(200, response.headers, b""), body_file)
+        return True
+
+    async def sweep(http: HTTPClient) -> List[bool]:
+        import asyncio
+
+        return await asyncio.gather(
+            *(fetch_one(http, *combo) for combo in product(sports, regions, markets))
+        )
+
+    if client is None:
+        async with HTTPClient() as http:
+            fetched = await sweep(http)
+    else:
+        fetched = await sweep(client)
+    return FetchResult(len(seen), rows, fetched.count(False), min(quota, default=None))
+
+
+def fetch_odds(api_key: str, **kwargs) -> FetchResult:
+    """Synchronous wrapper around :func:`fetch_odds_async`."""
+    import asyncio
+
+    return asyncio.run(fetch_odds_async(api_key, **kwargs))
+
+
+class RowAppender:
+    """Append rows to the odds CSV through a single open file.
+
+    The file is opened by the first write that has rows, so a request that
+    fails leaves it untouched, and the header is written if it is new or
+    empty.  Each write holds the lock of :func:`~odds_dedupe.lock_odds_file`
+    and so lands in the current file even if ``compact`` replaced it.
+    With ``dedupe`` only rows whose fight time or price changed since the
+    last quote for the same (event_id, fighter, bookmaker) are written;
+    see :class:`~odds_dedupe.QuoteIndex`.
+    """
+
+    def __init__(self, path: Path, dedupe: bool = False) -> None:
+        self.path = path
+        self.dedupe = dedupe
+        self.appended = 0
+
+    def __enter__(self) -> "RowAppender":
+        try:  # support running as a module or a script
+            from . import odds_dedupe
+        except ImportError:  # pragma: no cover - fallback when executed as a script
+            import odds_dedupe
+
+        self._dedupe = odds_dedupe
+        self._index = odds_dedupe.QuoteIndex.load(self.path) if self.dedupe else None
+        self._file = None
+        return self
+
+    def write(self, rows: Sequence[Sequence]) -> int:
+        """Append ``rows`` and return how many were written."""
+        if self._index is not None:
+            rows = self._index.changed(rows)
+        if not rows:
+            return 0
+        import csv
+
+        self._file = self._dedupe.lock_odds_file(self.path, self._file)
+        try:
+            writer = csv.writer(self._file)
+            if os.fstat(self._file.fileno()).st_size == 0:
+                writer.writerow(ODDS_COLUMNS)
+            writer.writerows(rows)
+        finally:
+            self._dedupe.unlock_odds_file(self._file)
+        self.appended += len(rows)
+        return len(rows)
+
+    def __exit__(self, *exc: object) -> None:
+        if self._file is not None:
+            self._file.close()
+        if self._index is not None:
+            if self._index.header is None:
+                self._index.header = list(ODDS_COLUMNS)
+            self._index.save()
+
+
+def append_rows(path: Path, rows: Sequence[Sequence], dedupe: bool = False) -> int:
+    """Append ``rows`` to the odds CSV; return the number written.
+
+    See :class:`RowAppender` for ``dedupe``.
+    """
+    with RowAppender(path, dedupe) as appender:
+        return appender.write(rows)
+
+
+class TokenBucket:
+    """Asyncio token bucket allowing ``rate`` tokens per second on average."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self, tokens: float = 1.0) -> None:
+        """Wait until ``tokens`` are available and take them."""
+        import asyncio
+
+        tokens = min(tokens, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return
+            wait = (tokens - self.tokens) / self.rate if self.rate > 0 else 60.0
+            await asyncio.sleep(min(wait, 60.0))
+
+
+# (seconds before the fight, poll interval) pairs, nearest first.
+POLL_TIERS = ((3600, 60.0), (6 * 3600, 300.0), (24 * 3600, 900.0), (7 * 24 * 3600, 3600.0))
+FAR_POLL_INTERVAL = 6 * 3600.0
+# Fights are still polled for this long after their scheduled start.
+LIVE_WINDOW = 3 * 3600
+# Seconds to hold polls back after a failed batch, doubling per consecutive failure.
+RETRY_BACKOFF = 30.0
+MAX_RETRY_BACKOFF = 1800.0
+
+
+def poll_interval(seconds_to_fight: float) -> float:
+    """Return how often to poll an event that starts in ``seconds_to_fight``."""
+    for horizon, interval in POLL_TIERS:
+        if seconds_to_fight < horizon:
+            return interval
+    return FAR_POLL_INTERVAL
+
+
+class OddsPoller:
+    """Long-running ingestion loop spending API credits where they matter.
+
+    Each event is polled at an interval set by :func:`poll_interval`, so
+    fights about to start are refreshed far more often than ones weeks
+    away.  Events that are due together share one request per
+    sport/region/market via ``eventIds``, and a periodic full sweep
+    discovers new events.  Unchanged quotes are not appended again.
+    Requests go through a :class:`TokenBucket` whose
+    rate is the lower of ``max_rate`` and the remaining quota spread over
+    ``quota_period`` seconds.  A batch that fails with an HTTP error, a
+    network error or timeout, or a malformed response is logged and all
+    polls are held back with exponential backoff; the loop keeps running.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        odds_file: Path,
+        sports: Sequence[str] = DEFAULT_SPORTS,
+        regions: Sequence[str] = DEFAULT_REGIONS,
+        markets: Sequence[str] = DEFAULT_MARKETS,
+        base_url: str = ODDS_API_URL,
+        max_rate: float = 10 / 60,
+        quota_period: float = 30 * 24 * 3600,
+        discovery_interval: float = 3600.0,
+        cache: ResponseCache | None = None,
+        dedupe: bool = True,
+    ) -> None:
+        self.api_key = api_key
+        self.odds_file = odds_file
+        self.sports, self.regions, self.markets = sports, regions, markets
+        self.base_url = base_url
+        self.max_rate = max_rate
+        self.quota_period = quota_period
+        self.discovery_interval = discovery_interval
+        self.cache = cache
+        self.dedupe = dedupe
+        self.cost = len(sports) * len(regions) * len(markets)
+        self.bucket = TokenBucket(max_rate, capacity=self.cost)
+        self.fight_times: Dict[str, float] = {}
+        self.next_due: Dict[str, float] = {}
+        self.next_discovery = 0.0
+        self.remaining: int | None = None
+        self.failures = 0  # consecutive failed batches
+
+    def track(self, event_id: str, fight_time: float, now: float) -> None:
+        """Schedule ``event_id`` according to its fight time."""
+        self.fight_times[event_id] = fight_time
+        self.next_due[event_id] = now + poll_interval(fight_time - now)
+
+    def _adapt_rate(self) -> None:
+        if self.remaining is not None:
+            self.bucket.rate = min(self.max_rate, self.remaining / self.quota_period)
+
+    def due_events(self, now: float) -> List[str]:
+        """Return scheduled events that are due, dropping finished fights."""
+        for event_id, fight_time in list(self.fight_times.items()):
+            if now > fight_time + LIVE_WINDOW:
+                del self.fight_times[event_id], self.next_due[event_id]
+        return [e for e, due in self.next_due.items() if due <= now]
+
+    async def poll_once(self, http: HTTPClient) -> Tuple[int, int] | None:
+        """Run one due request batch; return (events, rows) or None if idle."""
+        try:  # support running as a module or a script
+            from .odds_store import NO_TIME, parse_time
+        except ImportError:  # pragma: no cover - fallback when executed as a script
+            from odds_store import NO_TIME, parse_time
+
+        now = time.time()
+        if now >= self.next_discovery:
+            event_ids = None
+        else:
+            event_ids = self.due_events(now)
+            if not event_ids:
+                return None
+        await self.bucket.acquire(self.cost)
+        fight_times: Dict[str, str] = {}
+
+        def on_rows(rows: List[list]) -> None:
+            appender.write(rows)
+            for row in rows:
+                fight_times[row[0]] = row[1]
+
+        with RowAppender(self.odds_file, self.dedupe) as appender:
+            result = await fetch_odds_async(
+                self.api_key, self.sports, self.regions, self.markets, self.base_url,
+                client=http, cache=self.cache, event_ids=event_ids, on_rows=on_rows,
+            )
+        now = time.time()
+        if event_ids is None:
+            self.next_discovery = now + self.discovery_interval
+        for event_id in event_ids or ():
+            self.track(event_id, self.fight_times[event_id], now)
+        # Newly seen events join the schedule; a full sweep refreshes all.
+        for event_id, raw_time in fight_times.items():
+            if event_ids is None or event_id not in self.fight_times:
+                fight_time = parse_time(raw_time)
+                if fight_time != NO_TIME:
+                    self.track(event_id, fight_time, now)
+        if result.remaining is not None:
+            self.remaining = result.remaining
+            self._adapt_rate()
+        return result.events, appender.appended
+
+    def defer(self, until: float) -> None:
+        """Hold back every poll, including discovery, until ``until``."""
+        self.next_discovery = max(self.next_discovery, until)
+        for event_id, due in self.next_due.items():
+            self.next_due[event_id] = max(due, until)
+
+    def next_wake(self) -> float:
+        """Return the wall-clock time of the next scheduled poll."""
+        return min([self.next_discovery, *self.next_due.values()])
+
+    async def run(self, cycles: int | None = None, log=print) -> None:
+        """Poll until cancelled, or for ``cycles`` request batches."""
+        import asyncio
+
+        done = 0
+        async with HTTPClient() as http:
+            while cycles is None or done < cycles:
+                try:
+                    polled = await self.poll_once(http)
+                except (OddsAPIError, OSError, EOFError, ValueError, asyncio.TimeoutError) as exc:
+                    done += 1
+                    self.failures += 1
+                    delay = min(MAX_RETRY_BACKOFF, RETRY_BACKOFF * 2 ** (self.failures - 1))
+                    self.defer(time.time() + delay)
+                    log(f"{time.strftime('%H:%M:%S')} poll failed: {exc}; retrying in {delay:.0f} s")
+                    polled = None
+                if polled is not None:
+                    done += 1
+                    self.failures = 0
+                    log(
+                        f"{time.strftime('%H:%M:%S')} polled {polled[0]} events, appended {polled[1]} rows,"
+                        f" quota remaining {self.remaining if self.remaining is not None else 'unknown'}"
+                    )
+                if cycles is None or done < cycles:
+                    await asyncio.sleep(max(0.0, min(self.next_wake() - time.time(), 60.0)))
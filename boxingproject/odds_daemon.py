@@ -0,0 +1,275 @@
+"""Resident query daemon for ``boxing_app.py``.
+
+``boxing_app.py serve`` keeps the odds aggregate and the bet history in
+memory and answers fights/best/value/report/summary queries over a Unix
+domain socket next to the odds file.  Every query stats the two files and
+reloads whichever changed, so answers always match a fresh CLI run, and
+rendered answers are reused until then.  The CLI asks the daemon first and
+reads the files itself when no daemon is listening; importing this module
+for :func:`query` does not load the odds or bets code.
+
+The protocol is one JSON request line answered by one JSON reply line:
+``{"command": ..., "odds_file": ..., "bets_file": ..., "threshold": ..., "top": ...,
+"offset": ..., "limit": ...}``
+gets ``{"output": text}`` or ``{"error": message}``.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:  # pragma: no cover
+    import asyncio
+
+    from bet_tracker import BetTracker
+    from odds_aggregate import OddsAggregate
+    from odds_http import HTTPHandler
+
+SOCKET_SUFFIX = ".sock"
+# Seconds the CLI waits for an answer before reading the files itself.
+QUERY_TIMEOUT = 2.0
+# Distinct answers kept per file version; threshold sweeps could grow it unbounded.
+MEMO_SIZE = 1024
+
+Signature = Optional[Tuple[int, int, int]]
+
+
+def socket_path(odds_file: Path) -> Path:
+    """Return the daemon socket path used for odds CSV ``odds_file``."""
+    return odds_file.with_name(odds_file.name + SOCKET_SUFFIX)
+
+
+def _signature(path: Path) -> Signature:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def _bets_signature(path: Path) -> Signature:
+    # A SQLite ledger in WAL mode takes new bets in the -wal file first.
+    signature = _signature(path)
+    wal = _signature(path.with_name(path.name + "-wal"))
+    if signature is None or wal is None:
+        return signature
+    return signature[0] + wal[0], max(signature[1], wal[1]), signature[2]
+
+
+class WarmState:
+    """Odds aggregate and bet history kept in memory between queries.
+
+    :meth:`odds` and :meth:`bets` reload their file when its size, mtime or
+    inode changed since the last call.  The odds file is reloaded through
+    :func:`~odds_aggregate.incremental_aggregate`, so appends only cost the
+    new rows.  :meth:`memo` caches values derived from either one until it
+    is reloaded.
+    """
+
+    def __init__(self, odds_file: Path, bets_file: Path, workers: int = 1) -> None:
+        self.odds_file = Path(odds_file).resolve()
+        self.bets_file = Path(bets_file).resolve()
+        self.workers = workers
+        self._agg: OddsAggregate | None = None
+        self._tracker: BetTracker | None = None
+        self._signatures: Dict[str, Signature] = {}
+        self._memo: Dict[str, dict] = {"odds": {}, "bets": {}}
+
+    def _changed(self, source: str, path: Path) -> bool:
+        signature = _bets_signature(path) if source == "bets" else _signature(path)
+        if source in self._signatures and self._signatures[source] == signature:
+            return False
+        self._signatures[source] = signature
+        self._memo[source].clear()
+        return True
+
+    def odds(self) -> OddsAggregate:
+        """Return the aggregate of the current odds file."""
+        try:  # support running as a module or a script
+            from .odds_aggregate import OddsAggregate, incremental_aggregate
+        except ImportError:  # pragma: no cover - fallback when executed as a script
+            from odds_aggregate import OddsAggregate, incremental_aggregate
+
+        if self._changed("odds", self.odds_file) or self._agg is None:
+            if self.odds_file.exists():
+                self._agg = incremental_aggregate(self.odds_file, workers=self.workers)
+            else:
+                self._agg = OddsAggregate()
+        return self._agg
+
+    def bets(self) -> BetTracker:
+        """Return the tracker for the current bets file."""
+        try:  # support running as a module or a script
+            from .bet_tracker import BetTracker
+        except ImportError:  # pragma: no cover - fallback when executed as a script
+            from bet_tracker import BetTracker
+
+        if self._changed("bets", self.bets_file) or self._tracker is None:
+            self._tracker = BetTracker(self.bets_file)
+        return self._tracker
+
+    def version(self, source: str) -> Signature:
+        """Return the (size, mtime_ns, inode) of the file last loaded for ``source``."""
+        return self._signatures.get(source)
+
+    def memo(self, source: str, key: tuple, compute: Callable):
+        """Return ``compute(state)`` for ``source`` ("odds" or "bets"), cached."""
+        state = self.odds() if source == "odds" else self.bets()
+        cache = self._memo[source]
+        try:
+            return cache[key]
+        except KeyError:
+            if len(cache) >= MEMO_SIZE:
+                cache.clear()
+            value = cache[key] = compute(state)
+            return value
+
+
+class QueryHandler:
+    """Answer CLI requests from a :class:`WarmState`.
+
+    ``render_odds(aggregate, command, threshold, top)`` and
+    ``render_bets(tracker, offset, limit)`` produce exactly what the CLI
+    would print.
+    """
+
+    def __init__(
+        self,
+        state: WarmState,
+        render_odds: Callable[[OddsAggregate, str, float, Optional[int]], str],
+        render_bets: Callable[[BetTracker, int, Optional[int]], str],
+    ) -> None:
+        self.state = state
+        self.render_odds = render_odds
+        self.render_bets = render_bets
+
+    def answer(self, request: dict) -> dict:
+        """Return the reply for one decoded request."""
+        state = self.state
+        if (
+            Path(request.get("odds_file", "")) != state.odds_file
+            or Path(request.get("bets_file", "")) != state.bets_file
+        ):
+            return {"error": f"serving {state.odds_file} and {state.bets_file}"}
+        command = request.get("command")
+        if command == "summary":
+            offset = int(request.get("offset") or 0)
+            limit = request.get("limit")
+            limit = int(limit) if limit is not None else None
+            key = ("text", offset, limit)
+            return {"output": state.memo("bets", key, lambda tracker: self.render_bets(tracker, offset, limit))}
+        if command not in {"fights", "best", "value", "report"}:
+            return {"error": f"unknown command {command!r}"}
+        threshold = float(request.get("threshold", 0.05)) if command in {"value", "report"} else 0.05
+        top = request.get("top") if command == "value" else None
+        top = int(top) if top is not None else None
+        key = ("text", command, threshold, top)
+        return {"output": state.memo("odds", key, lambda agg: self.render_odds(agg, command, threshold, top))}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve one connection: a request line in, a reply line out."""
+        import json
+
+        try:
+            line = await reader.readline()
+            try:
+                reply = self.answer(json.loads(line))
+            except (ValueError, TypeError, AttributeError, OSError) as exc:
+                reply = {"error": str(exc)}
+            writer.write(json.dumps(reply).encode("utf-8") + b"\n")
+            await writer.drain()
+        except ConnectionError:
+            pass  # the client gave up
+        finally:
+            writer.close()
+
+
+async def serve(
+    handler: QueryHandler,
+    path: Path | None,
+    http: HTTPHandler | None = None,
+    http_address: Tuple[str, int] = ("127.0.0.1", 8080),
+) -> None:
+    """Listen on Unix socket ``path`` and, with ``http``, on ``http_address``.
+
+    Runs until cancelled.  ``path`` may be None to serve HTTP only.
+    """
+    import asyncio
+
+    servers = []
+    if path is not None and not hasattr(asyncio, "start_unix_server"):
+        if http is None:
+            raise SystemExit("serve needs Unix domain sockets here; use --http-port")
+        path = None
+    if path is not None:
+        if path.exists():
+            if _listening(path):
+                raise SystemExit(f"a daemon is already listening on {path}")
+            path.unlink()  # left behind by a daemon that did not exit cleanly
+    handler.state.odds()  # load before accepting queries
+    handler.state.bets()
+    try:
+        if path is not None:
+            servers.append(await asyncio.start_unix_server(handler.handle, str(path)))
+        if http is not None:
+            try:
+                servers.append(await asyncio.start_server(http.handle, *http_address))
+            except OSError as exc:
+                raise SystemExit(f"cannot serve HTTP: {exc.strerror}")
+        try:  # exit cleanly, removing the socket, when stopped with SIGTERM
+            import signal
+
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+        except (ImportError, AttributeError, NotImplementedError):
+            pass
+        await asyncio.gather(*(server.serve_forever() for server in servers))
+    except asyncio.CancelledError:
+        pass
+    finally:
+        for server in servers:
+            server.close()
+        if servers and path is not None:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def _listening(path: Path) -> bool:
+    import socket
+
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(str(path))
+        except OSError:
+            return False
+    return True
+
+
+def query(path: Path, request: dict, timeout: float = QUERY_TIMEOUT) -> str | None:
+    """Send ``request`` to the daemon on ``path`` and return its output.
+
+    Returns None when no daemon is listening, it does not answer within
+    ``timeout`` seconds, or it declines the request (e.g. it serves other
+    files); the caller should then compute the answer itself.
+    """
+    if not path.exists():
+        return None
+    import json
+    import socket
+
+    if not hasattr(socket, "AF_UNIX"):
+        return None
+    chunks = []
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            sock.sendall(json.dumps(request).encode("utf-8") + b"\n")
+            while chunk := sock.recv(65536):
+                chunks.append(chunk)
+        reply = json.loads(b"".join(chunks))
+    except (OSError, ValueError):
+        return None
+    return reply.get("output") if isinstance(reply, dict) else None
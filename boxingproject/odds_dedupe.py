@@ -0,0 +1,194 @@
+"""Change detection for odds quotes appended to ``boxing_odds.csv``.
+
+Pollers see the same price from a bookmaker many times before it moves.
+Only the first row of each run of identical quotes for an (event_id,
+fighter, bookmaker) carries information, so new rows are appended only when
+the fight time or price changed and :func:`compact_odds` collapses runs
+already on disk.
+
+Compacting changes ``avg_odds`` and ``value_pct``: the average is then
+taken over price changes rather than over polls, so a price that held for
+many polls no longer weighs more than one that moved straight away.
+
+Appenders and :func:`compact_odds` coordinate through an exclusive
+``flock`` on the odds file, taken with :func:`lock_odds_file`.
+"""
+from __future__ import annotations
+
+import csv
+import os
+from pathlib import Path
+from typing import IO, BinaryIO, Dict, Iterable, List, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - no advisory locks on Windows
+    fcntl = None
+
+try:  # support running as a module or a script
+    from .sidecar import covers_prefix, digest_before, read_state, temp_path, write_state
+except ImportError:  # pragma: no cover - fallback when executed as a script
+    from sidecar import covers_prefix, digest_before, read_state, temp_path, write_state
+
+QUOTES_SUFFIX = ".quotes"
+_QUOTES_VERSION = 2
+
+QuoteKey = Tuple[str, str, str]
+Quote = Tuple[str, float]  # (time, price)
+
+
+def quotes_path(path: Path) -> Path:
+    """Return the quote index path used for odds CSV ``path``."""
+    return path.with_name(path.name + QUOTES_SUFFIX)
+
+
+def lock_odds_file(path: Path, f: IO | None = None, mode: str = "a") -> IO:
+    """Return ``f``, or ``path`` opened with ``mode``, holding the file's exclusive lock.
+
+    :func:`compact_odds` replaces the file while holding this lock, so once
+    it is acquired a handle to a file that has been replaced meanwhile is
+    reopened; rows are never written to, or read from, a stale copy.
+    Release the lock with :func:`unlock_odds_file`.
+    """
+    while True:
+        if f is None:
+            f = path.open(mode, newline="")
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            if os.stat(path).st_ino == os.fstat(f.fileno()).st_ino:
+                return f
+        except FileNotFoundError:
+            pass
+        f.close()
+        f = None
+
+
+def unlock_odds_file(f: IO) -> None:
+    """Flush ``f`` and release the lock taken by :func:`lock_odds_file`."""
+    f.flush()
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+def _columns(header: List[str]) -> Tuple[int, int, int, int, int]:
+    col = {name: i for i, name in enumerate(header)}
+    return col["event_id"], col["time"], col["fighter"], col["bookmaker"], col["decimal_odds"]
+
+
+class QuoteIndex:
+    """Last (time, price) seen for every (event_id, fighter, bookmaker) in a file.
+
+    The index is stored next to the odds file with the byte offset it
+    covers.  Loading it only scans rows appended since then; a file that
+    was rewritten is rescanned from the start.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.last: Dict[QuoteKey, Quote] = {}
+        self.header: List[str] | None = None
+
+    @classmethod
+    def load(cls, path: Path) -> "QuoteIndex":
+        """Return the index for odds file ``path``, brought up to date."""
+        index = cls(path)
+        if not path.exists():
+            return index
+        state = read_state(quotes_path(path), _QUOTES_VERSION)
+        with path.open("rb") as f:
+            if state is not None and covers_prefix(f, state, os.fstat(f.fileno()).st_size):
+                index.header = state["header"]
+                index.last = {(e, fi, b): (t, price) for e, fi, b, t, price in state["quotes"]}
+                f.seek(state["offset"])
+            else:
+                f.seek(0)
+            index._scan(f)
+        return index
+
+    def _scan(self, f: BinaryIO) -> None:
+        lines = (line.decode("utf-8") for line in f)
+        reader = csv.reader(lines)
+        if self.header is None:
+            self.header = next(reader, None)
+            if self.header is None:
+                return
+        e, t, fi, b, o = _columns(self.header)
+        last = self.last
+        for rec in reader:
+            if rec:
+                last[(rec[e], rec[fi], rec[b])] = (rec[t], float(rec[o]))
+
+    def changed(self, rows: Iterable[Sequence]) -> List[Sequence]:
+        """Return the rows whose time or price differs from the last quote.
+
+        ``rows`` use the ``boxing_odds.csv`` column order, so a rescheduled
+        fight is kept even at an unchanged price.  The index is updated as
+        if the returned rows had been appended.
+        """
+        out = []
+        last = self.last
+        for row in rows:
+            key = (row[0], row[2], row[4])
+            quote = (str(row[1]), float(row[3]))
+            if last.get(key) != quote:
+                last[key] = quote
+                out.append(row)
+        return out
+
+    def save(self) -> None:
+        """Persist the index for the current contents of the odds file."""
+        if self.header is None or not self.path.exists():
+            return
+        with self.path.open("rb") as f:
+            offset = os.fstat(f.fileno()).st_size
+            digest = digest_before(f, offset)
+        state = {
+            "version": _QUOTES_VERSION,
+            "offset": offset,
+            "digest": digest,
+            "header": self.header,
+            "quotes": [[*key, *quote] for key, quote in self.last.items()],
+        }
+        write_state(quotes_path(self.path), state)  # rebuilt from the odds file when missing
+
+
+def compact_odds(path: Path) -> Tuple[int, int]:
+    """Drop rows repeating the previous time and price for their key, in place.
+
+    Averages computed from the file afterwards are over price changes
+    rather than polls; see the module docstring.  Returns ``(rows kept,
+    rows read)``.  The file is rewritten atomically while holding its lock,
+    so concurrent appenders wait and then append to the compacted file.
+    """
+    index = QuoteIndex(path)
+    kept = total = 0
+    tmp = temp_path(path)
+    with lock_odds_file(path, mode="r") as src:
+        try:
+            with tmp.open("w", newline="") as dst:
+                reader = csv.reader(src)
+                writer = csv.writer(dst)
+                index.header = next(reader, None)
+                if index.header is None:
+                    tmp.unlink()
+                    return 0, 0
+                writer.writerow(index.header)
+                e, t, fi, b, o = _columns(index.header)
+                last = index.last
+                for rec in reader:
+                    if not rec:
+                        continue
+                    total += 1
+                    key = (rec[e], rec[fi], rec[b])
+                    quote = (rec[t], float(rec[o]))
+                    if last.get(key) != quote:
+                        last[key] = quote
+                        writer.writerow(rec)
+                        kept += 1
+            os.replace(tmp, path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+    index.save()
+    return kept, total
@@ -0,0 +1,151 @@
+"""Read-only HTTP/JSON API over the odds and bets kept by ``serve``.
+
+``boxing_app.py serve --http-port N`` answers::
+
+    GET /fights                  upcoming fights
+    GET /best                    best odds per fighter
+    GET /value?threshold=0.05    value bets; ``&top=K`` keeps the K best
+    GET /bets/summary            bet history and total profit
+
+Rows are the dicts returned by :class:`~odds_aggregate.OddsAggregate` and
+:meth:`~bet_tracker.BetTracker.summary`, with times as ISO 8601 strings.
+Complete responses are built once per file version and URL and replayed
+from memory until the CSV behind them changes, so a request costs a stat
+call and a socket write.  Responses carry an ETag derived from the file
+version and honour ``If-None-Match``.
+"""
+from __future__ import annotations
+
+from datetime import datetime
+from typing import TYPE_CHECKING, Callable, Dict, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+try:  # support running as a module or a script
+    from .odds_daemon import WarmState
+except ImportError:  # pragma: no cover - fallback when executed as a script
+    from odds_daemon import WarmState
+
+if TYPE_CHECKING:  # pragma: no cover
+    import asyncio
+
+_REASONS = {
+    200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    500: "Internal Server Error",
+}
+# Requests larger than this are refused; the API only takes short GETs.
+MAX_HEADER_BYTES = 16384
+
+
+def _json_default(value: object) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _response(status: int, body: bytes = b"", headers: Dict[str, str] | None = None) -> bytes:
+    lines = [f"HTTP/1.1 {status} {_REASONS[status]}", f"Content-Length: {len(body)}"]
+    if body:
+        lines.append("Content-Type: application/json")
+    lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+def _error(status: int, message: str) -> bytes:
+    import json
+
+    return _response(status, json.dumps({"error": message}).encode("utf-8"))
+
+
+# path -> (source, rows for (state, threshold, top), takes query parameters)
+ROUTES: Dict[str, Tuple[str, Callable, bool]] = {
+    "/fights": ("odds", lambda agg, threshold, top: agg.fights(), False),
+    "/best": ("odds", lambda agg, threshold, top: agg.best(), False),
+    "/value": ("odds", lambda agg, threshold, top: agg.value(threshold, top), True),
+    "/bets/summary": ("bets", lambda tracker, threshold, top: tracker.summary(), False),
+}
+
+
+class HTTPHandler:
+    """Serve :data:`ROUTES` from a :class:`~odds_daemon.WarmState`."""
+
+    def __init__(self, state: WarmState) -> None:
+        self.state = state
+
+    def respond(self, method: str, target: str, headers: Dict[str, str]) -> bytes:
+        """Return the complete response for one request."""
+        if method not in ("GET", "HEAD"):
+            return _error(405, "only GET is supported")
+        url = urlsplit(target)
+        path = url.path.rstrip("/") or "/"
+        route = ROUTES.get(path)
+        if route is None:
+            return _error(404, f"no such resource: {url.path}")
+        source, rows, takes_params = route
+        threshold, top = 0.05, None
+        if takes_params:
+            query = parse_qs(url.query)
+            try:
+                threshold = float(query.get("threshold", ["0.05"])[-1])
+                top = int(query["top"][-1]) if "top" in query else None
+            except ValueError:
+                return _error(400, "threshold must be a number and top an integer")
+            if top is not None and top < 1:
+                return _error(400, "top must be at least 1")
+        response, etag = self.state.memo(
+            source, ("http", path, threshold, top), lambda state: self._build(source, rows(state, threshold, top))
+        )
+        if headers.get("if-none-match") == etag:
+            return _response(304, headers={"ETag": etag})
+        if method == "HEAD":
+            return response[: response.index(b"\r\n\r\n") + 4]
+        return response
+
+    def _build(self, source: str, rows: list) -> Tuple[bytes, str]:
+        import json
+
+        # Called by memo() right after the state was refreshed, so the
+        # version is the one these rows were computed from.
+        signature = self.state.version(source)
+        etag = '"%s"' % "-".join(f"{n:x}" for n in signature or (0,))
+        body = json.dumps(rows, default=_json_default, separators=(",", ":")).encode("utf-8")
+        return _response(200, body, {"ETag": etag, "Cache-Control": "no-cache"}), etag
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        """Serve requests on one keep-alive connection until it closes."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers: Dict[str, str] = {}
+                size = len(request_line)
+                while True:
+                    line = await reader.readline()
+                    size += len(line)
+                    if line in (b"\r\n", b"\n", b"") or size > MAX_HEADER_BYTES:
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    writer.write(_error(400, "malformed request line"))
+                    break
+                length = int(headers.get("content-length", 0))
+                if size > MAX_HEADER_BYTES or length > MAX_HEADER_BYTES:
+                    writer.write(_error(400, "request too large"))
+                    break
+                if length:
+                    await reader.readexactly(length)
+                try:
+                    writer.write(self.respond(method, target, headers))
+                except (OSError, ValueError) as exc:  # unreadable CSV
+                    writer.write(_error(500, str(exc)))
+                await writer.drain()
+                connection = headers.get("connection", "").lower()
+                if connection == "close" or (version == "HTTP/1.0" and connection != "keep-alive"):
+                    break
+        except (ConnectionError, EOFError, ValueError):
+            pass  # the client went away or sent garbage
+        finally:
+            writer.close()
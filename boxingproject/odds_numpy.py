@@ -0,0 +1,105 @@
+"""Optional NumPy backend for grouped odds reductions.
+
+The stdlib code in :mod:`boxing_app` remains the reference implementation;
+this module reproduces its results exactly with vectorised operations and
+is only used when NumPy can be imported.
+"""
+from __future__ import annotations
+
+from typing import Tuple
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - NumPy is optional
+    np = None
+
+try:  # support running as a module or a script
+    from .odds_store import NO_TIME, OddsTable
+except ImportError:  # pragma: no cover - fallback when executed as a script
+    from odds_store import NO_TIME, OddsTable
+
+# Set to False to force the stdlib implementation.
+ENABLED = np is not None
+
+# Groups still summing below which the vectorised Neumaier loop stops.
+_MIN_ACTIVE = 64
+
+
+def available() -> bool:
+    """Return True when the NumPy backend should be used."""
+    return ENABLED and np is not None
+
+
+def _column(values):
+    return np.frombuffer(values, dtype=values.typecode)
+
+
+def group_reduce(table: OddsTable, with_sums: bool = True) -> Tuple:
+    """Reduce ``table`` per (event, fighter) group.
+
+    Groups are numbered in order of first appearance, matching dict
+    insertion order in the stdlib path.  Returns ``(best_rows, sums, comps,
+    counts)`` where ``best_rows`` holds the index of the first row with the
+    group's maximum odds and ``sums``/``comps`` are the Neumaier-compensated
+    running sums computed in row order.  ``sums`` and ``comps`` are None
+    when ``with_sums`` is False.
+    """
+    n = len(table)
+    if n == 0:
+        empty = np.empty(0, dtype=np.int64)
+        no_sums = np.empty(0) if with_sums else None
+        return empty, no_sums, no_sums, empty
+
+    # Same packing as odds_store.pack_key.
+    keys = _column(table.event_codes).astype(np.int64) << 32
+    keys |= _column(table.fighter_codes)
+    _, first_idx, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    rank = np.empty(len(first_idx), dtype=np.int64)
+    rank[np.argsort(first_idx)] = np.arange(len(first_idx))
+    gid = rank[inverse.ravel()]
+
+    order = np.argsort(gid, kind="stable")
+    counts = np.bincount(gid)
+    starts = np.zeros(len(counts), dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+
+    vals = _column(table.odds)[order]
+    gmax = np.maximum.reduceat(vals, starts)
+    pos = np.where(vals == np.repeat(gmax, counts), np.arange(n), n)
+    best_rows = order[np.minimum.reduceat(pos, starts)]
+
+    if not with_sums:
+        return best_rows, None, None, counts
+
+    # Neumaier summation, vectorised across groups one position at a time so
+    # every group sees exactly the same operations as the sequential loop.
+    # Once fewer than _MIN_ACTIVE groups remain the per-step overhead would
+    # dominate, so the longest groups finish in a plain loop over their slice.
+    sums = vals[starts].copy()
+    comps = np.zeros(len(counts))
+    ranked = np.sort(counts)[::-1]
+    stop = int(ranked[_MIN_ACTIVE - 1]) if len(ranked) >= _MIN_ACTIVE else 1
+    for k in range(1, stop):
+        active = np.flatnonzero(counts > k)
+        x = vals[starts[active] + k]
+        s = sums[active]
+        t = s + x
+        comps[active] += np.where(np.abs(s) >= np.abs(x), (s - t) + x, (x - t) + s)
+        sums[active] = t
+    for g in np.flatnonzero(counts > stop).tolist():
+        s, c = float(sums[g]), float(comps[g])
+        begin = int(starts[g])
+        for x in vals[begin + stop:begin + int(counts[g])].tolist():
+            t = s + x
+            c += (s - t) + x if abs(s) >= abs(x) else (x - t) + s
+            s = t
+        sums[g], comps[g] = s, c
+    return best_rows, sums, comps, counts
+
+
+def event_first_times(table: OddsTable):
+    """Return the earliest time of each event, indexed by event code."""
+    first = np.full(len(table.events), NO_TIME, dtype=np.int64)
+    if len(table):
+        np.minimum.at(first, _column(table.event_codes), _column(table.times))
+    return first
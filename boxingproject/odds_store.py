@@ -0,0 +1,299 @@
+"""Columnar storage for odds rows using only the standard library."""
+from __future__ import annotations
+
+import csv
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple
+
+try:  # support running as a module or a script
+    from .sidecar import temp_path
+except ImportError:  # pragma: no cover - fallback when executed as a script
+    from sidecar import temp_path
+
+# Sentinel stored in the time column when a row has no parseable timestamp.
+# It sorts after every real time so such rows never win "earliest time".
+NO_TIME = 2**63 - 1
+
+# Odds files repeat a handful of fight times across millions of rows, so
+# timestamp conversions are memoised on the raw value.
+TIME_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def parse_time(raw: str) -> int:
+    """Parse an ISO timestamp into integer epoch seconds.
+
+    Naive timestamps are treated as UTC.  Unparseable values map to
+    :data:`NO_TIME`.  Results are cached per distinct string.
+    """
+    if raw.endswith("Z"):
+        raw = raw[:-1] + "+00:00"
+    try:
+        dt = datetime.fromisoformat(raw)
+    except ValueError:
+        return NO_TIME
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+@lru_cache(maxsize=TIME_CACHE_SIZE)
+def to_datetime(ts: int) -> datetime | None:
+    """Convert epoch seconds from the time column back to a UTC datetime."""
+    if ts == NO_TIME:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc)
+
+
+class Vocabulary:
+    """Append-only dictionary encoding between strings and dense int codes.
+
+    Each distinct value is stored once and identified by its insertion
+    index, so columns and group keys can hold small integers instead of
+    repeated strings.  Vocabularies can be shared between a table and the
+    aggregates built from it.
+    """
+
+    __slots__ = ("values", "_codes")
+
+    def __init__(self, values: Iterable[str] = ()) -> None:
+        self.values: List[str] = list(values)
+        self._codes: Dict[str, int] = {v: i for i, v in enumerate(self.values)}
+
+    def encode(self, value: str) -> int:
+        """Return the code for ``value``, assigning the next one if new."""
+        code = self._codes.get(value)
+        if code is None:
+            code = self._codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def __getitem__(self, code: int) -> str:
+        return self.values[code]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.values)
+
+
+def pack_key(event: int, fighter: int) -> int:
+    """Pack an (event, fighter) code pair into one integer group key."""
+    return event << 32 | fighter
+
+
+def unpack_key(key: int) -> Tuple[int, int]:
+    """Split a key from :func:`pack_key` back into its two codes."""
+    return key >> 32, key & 0xFFFFFFFF
+
+
+class OddsRecord(NamedTuple):
+    """A single parsed odds row; ``time`` is epoch seconds or NO_TIME."""
+
+    event_id: str
+    time: int
+    fighter: str
+    bookmaker: str
+    decimal_odds: float
+
+
+class OddsTable:
+    """Odds rows stored as parallel typed arrays.
+
+    String columns are dictionary encoded: ``event_codes``, ``fighter_codes``
+    and ``bookmaker_codes`` index into the ``events``, ``fighters`` and
+    ``bookmakers`` vocabularies.  Odds are float64 and times int64 epoch
+    seconds, so a row costs a few dozen bytes instead of a dict per row.
+    """
+
+    def __init__(
+        self,
+        events: Vocabulary | None = None,
+        fighters: Vocabulary | None = None,
+        bookmakers: Vocabulary | None = None,
+    ) -> None:
+        self.events = events if events is not None else Vocabulary()
+        self.fighters = fighters if fighters is not None else Vocabulary()
+        self.bookmakers = bookmakers if bookmakers is not None else Vocabulary()
+        self.event_codes = array("I")
+        self.fighter_codes = array("I")
+        self.bookmaker_codes = array("I")
+        self.odds = array("d")
+        self.times = array("q")
+
+    def __len__(self) -> int:
+        return len(self.odds)
+
+    def append(self, event_id: str, time: int, fighter: str, bookmaker: str, decimal_odds: float) -> None:
+        """Append a single row, encoding its string columns."""
+        self.event_codes.append(self.events.encode(event_id))
+        self.fighter_codes.append(self.fighters.encode(fighter))
+        self.bookmaker_codes.append(self.bookmakers.encode(bookmaker))
+        self.odds.append(decimal_odds)
+        self.times.append(time)
+
+    def row(self, i: int) -> dict:
+        """Return row ``i`` decoded as a dict in the original CSV layout."""
+        return {
+            "event_id": self.events[self.event_codes[i]],
+            "time": to_datetime(self.times[i]),
+            "fighter": self.fighters[self.fighter_codes[i]],
+            "bookmaker": self.bookmakers[self.bookmaker_codes[i]],
+            "decimal_odds": self.odds[i],
+        }
+
+    def __iter__(self) -> Iterator[OddsRecord]:
+        events, fighters, bookmakers = self.events, self.fighters, self.bookmakers
+        columns = (self.event_codes, self.times, self.fighter_codes, self.bookmaker_codes, self.odds)
+        for e, t, f, b, o in zip(*columns):
+            yield OddsRecord(events[e], t, fighters[f], bookmakers[b], o)
+
+
+def record_parser(header: List[str]) -> Callable[[List[str]], OddsRecord]:
+    """Return a function turning raw CSV fields into an :class:`OddsRecord`."""
+    col = {name: i for i, name in enumerate(header)}
+    e, t, fi, b, o = (col[c] for c in ("event_id", "time", "fighter", "bookmaker", "decimal_odds"))
+
+    def parse(rec: List[str]) -> OddsRecord:
+        return OddsRecord(rec[e], parse_time(rec[t]), rec[fi], rec[b], float(rec[o]))
+
+    return parse
+
+
+def iter_records(path: Path) -> Iterator[OddsRecord]:
+    """Lazily parse the rows of an odds CSV file."""
+    with path.open(newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        parse = record_parser(header)
+        for rec in reader:
+            if rec:
+                yield parse(rec)
+
+
+def read_csv(path: Path) -> OddsTable:
+    """Parse an odds CSV file into an :class:`OddsTable`."""
+    table = OddsTable()
+    append = table.append
+    for rec in iter_records(path):
+        append(*rec)
+    return table
+
+
+# Binary sidecar cache
+# --------------------
+# Layout (all header integers little-endian, columns in native byte order):
+#   header    _CACHE_HEADER, see _source_signature() for the CSV fields
+#   vocab     events, fighters and bookmakers as NUL terminated UTF-8
+#   padding   to an 8 byte boundary
+#   columns   times (q), odds (d), event/fighter/bookmaker codes (I)
+# Columns are aligned so the file can be memory-mapped as typed arrays.
+
+CACHE_SUFFIX = ".cache"
+_CACHE_MAGIC = b"BXOC"
+_CACHE_VERSION = 1
+_CACHE_HEADER = struct.Struct("<4sIc3xQQ16sQQQQ")
+_TAIL_BYTES = 4096
+
+
+def cache_path(path: Path) -> Path:
+    """Return the binary cache path used for odds CSV ``path``."""
+    return path.with_name(path.name + CACHE_SUFFIX)
+
+
+def _source_signature(path: Path) -> Tuple[int, int, bytes]:
+    """Return (size, mtime_ns, tail digest) identifying the CSV contents."""
+    st = path.stat()
+    with path.open("rb") as f:
+        f.seek(max(0, st.st_size - _TAIL_BYTES))
+        tail = hashlib.blake2b(f.read(), digest_size=16).digest()
+    return st.st_size, st.st_mtime_ns, tail
+
+
+def _byteorder_flag() -> bytes:
+    return b"<" if sys.byteorder == "little" else b">"
+
+
+def write_cache(table: OddsTable, path: Path, signature: Tuple[int, int, bytes]) -> None:
+    """Write ``table`` to the binary cache file at ``path`` atomically."""
+    vocab = [
+        "".join(s + "\0" for s in v).encode("utf-8")
+        for v in (table.events, table.fighters, table.bookmakers)
+    ]
+    size, mtime_ns, tail = signature
+    header = _CACHE_HEADER.pack(
+        _CACHE_MAGIC, _CACHE_VERSION, _byteorder_flag(), size, mtime_ns, tail,
+        len(table), *(len(v) for v in vocab),
+    )
+    body = header + b"".join(vocab)
+    pad = -len(body) % 8
+    tmp = temp_path(path)
+    with tmp.open("wb") as f:
+        f.write(body)
+        f.write(b"\0" * pad)
+        for column in (table.times, table.odds, table.event_codes, table.fighter_codes, table.bookmaker_codes):
+            column.tofile(f)
+    os.replace(tmp, path)
+
+
+def read_cache(path: Path, signature: Tuple[int, int, bytes]) -> OddsTable | None:
+    """Return the cached table at ``path`` if it matches ``signature``."""
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    if len(data) < _CACHE_HEADER.size:
+        return None
+    magic, version, order, size, mtime_ns, tail, nrows, *vocab_lens = _CACHE_HEADER.unpack_from(data)
+    if (magic, version, order) != (_CACHE_MAGIC, _CACHE_VERSION, _byteorder_flag()):
+        return None
+    if (size, mtime_ns, tail) != signature:
+        return None
+
+    view = memoryview(data)
+    pos = _CACHE_HEADER.size
+    vocabs = []
+    for n in vocab_lens:
+        vocabs.append(Vocabulary(bytes(view[pos:pos + n]).decode("utf-8").split("\0")[:-1]))
+        pos += n
+    table = OddsTable(*vocabs)
+    pos += -pos % 8
+    for name in ("times", "odds", "event_codes", "fighter_codes", "bookmaker_codes"):
+        column = getattr(table, name)
+        end = pos + nrows * column.itemsize
+        if end > len(data):
+            return None
+        column.frombytes(view[pos:end])
+        pos = end
+    return table
+
+
+def cached_table(path: Path) -> OddsTable | None:
+    """Return the table from ``path``'s binary cache if it is current, else None."""
+    return read_cache(cache_path(path), _source_signature(path))
+
+
+def load_table(path: Path, use_cache: bool = True) -> OddsTable:
+    """Load ``path`` via its binary cache, rebuilding the cache when stale."""
+    if not use_cache:
+        return read_csv(path)
+    signature = _source_signature(path)
+    cpath = cache_path(path)
+    table = read_cache(cpath, signature)
+    if table is None:
+        table = read_csv(path)
+        try:
+            write_cache(table, cpath, signature)
+        except OSError:
+            pass  # read-only location; caching is best effort
+    return table
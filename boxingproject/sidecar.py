@@ -0,0 +1,70 @@
+"""Small state files kept next to append-only CSV files.
+
+Checkpoints, quote indexes and bet totals all record how far into a CSV
+they reach: the byte offset and a digest of the bytes just before it.  A
+reader trusts the state only if the file still has those bytes there, i.e.
+it was only appended to since.  Standard library only and imported lazily,
+so it stays cheap for the commands that need it at startup.
+"""
+from __future__ import annotations
+
+import os
+from pathlib import Path
+from typing import BinaryIO
+
+
+def digest_before(f: BinaryIO, offset: int, size: int = 4096) -> str:
+    """Return a digest of the ``size`` bytes of ``f`` preceding ``offset``."""
+    import hashlib
+
+    start = max(0, offset - size)
+    f.seek(start)
+    return hashlib.blake2b(f.read(offset - start), digest_size=16).hexdigest()
+
+
+def covers_prefix(f: BinaryIO, state: dict, size: int) -> bool:
+    """Return True if ``state`` describes a prefix of the ``size``-byte file ``f``."""
+    return state["offset"] <= size and digest_before(f, state["offset"]) == state["digest"]
+
+
+def temp_path(path: Path) -> Path:
+    """Return a per-process temporary path to write ``path`` atomically.
+
+    Concurrent processes may refresh the same sidecar; each writes its own
+    file and the last ``os.replace`` wins.
+    """
+    return path.with_name(f"{path.name}.{os.getpid()}.tmp")
+
+
+def read_state(path: Path, version: int) -> dict | None:
+    """Return the JSON state at ``path`` if it has ``version``, else None."""
+    import json
+
+    try:
+        with path.open() as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get("version") != version:
+        return None
+    return state
+
+
+def write_state(path: Path, state: dict) -> None:
+    """Atomically replace the JSON state at ``path``; failures are ignored.
+
+    Sidecars are only an optimisation and are rebuilt from the CSV when
+    missing, so a read-only location just means they are not kept.
+    """
+    import json
+
+    tmp = temp_path(path)
+    try:
+        with tmp.open("w") as f:
+            json.dump(state, f, separators=(",", ":"))
+        os.replace(tmp, path)
+    except OSError:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
@@ -1,24 +1,24 @@
-import requests
-import pandas as pd
+"""Print how many boxing events the odds API currently lists.
 
-# 🔐 Replace this with your actual API key
-API_KEY = "89c61046d8ed0ccf9ebfa3996ef443cc"
+Uses the standard-library client in :mod:`odds_api`; see ``API.py`` for the
+script that also appends the odds to ``boxing_odds.csv``.
+"""
+import os
 
-# 📡 API endpoint and parameters
-url = "https://api.the-odds-api.com/v4/sports/boxing_boxing/odds"
-params = {
-    "apiKey": API_KEY,
-    "regions": "us,uk,eu",       # Betting regions
-    "markets": "h2h",            # "head-to-head" odds
-    "oddsFormat": "decimal"      # You can also use 'american' or 'fractional'
-}
+try:  # support running as a module or a script
+    from .odds_api import OddsAPIError, fetch_odds
+except ImportError:  # pragma: no cover - fallback when executed as a script
+    from odds_api import OddsAPIError, fetch_odds
 
-# 🚀 Send the GET request
-response = requests.get(url, params=params)
+# 🔐 Set ODDS_API_KEY to your API key
+API_KEY = os.environ.get("ODDS_API_KEY")
 
-# 📦 Convert response to JSON
-if response.status_code == 200:
-    data = response.json()
-    print(f"Received {len(data)} events.")
-else:
-    print("Error:", response.status_code, response.text)
+if __name__ == "__main__":
+    if not API_KEY:
+        raise SystemExit("Set ODDS_API_KEY to your odds API key")
+    try:
+        result = fetch_odds(API_KEY)  # regions us,uk,eu; h2h; decimal odds
+    except OddsAPIError as exc:
+        print("Error:", exc.status, exc.body.decode("utf-8", "replace"))
+    else:
+        print(f"Received {result.events} events.")
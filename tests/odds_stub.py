@@ -0,0 +1,133 @@
+"""Local stand-in for the-odds-api, for exercising the fetcher offline.
+
+Usage::
+
+    python tests/odds_stub.py --port 8765
+    python boxing_app.py fetch --api-key test --base-url http://127.0.0.1:8765
+
+Serves a fixed list of events on ``/sports/<sport>/odds`` with an ETag and
+``x-requests-remaining``, answers ``If-None-Match`` with 304 and can be
+told to fail the next requests with a given status.
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+from urllib.parse import parse_qs, urlsplit
+
+SAMPLE_EVENTS = [
+    {
+        "id": "e1",
+        "commence_time": "2030-01-01T20:00:00Z",
+        "bookmakers": [
+            {"key": "bk1", "markets": [{"key": "h2h", "outcomes": [
+                {"name": "Fighter A", "price": 1.8}, {"name": "Fighter B", "price": 2.1},
+            ]}]},
+            {"key": "bk2", "markets": [{"key": "h2h", "outcomes": [
+                {"name": "Fighter A", "price": 1.9}, {"name": "Fighter B", "price": 2.0},
+            ]}]},
+        ],
+    },
+    {
+        "id": "e2",
+        "commence_time": "2030-02-01T20:00:00Z",
+        "bookmakers": [
+            {"key": "bk1", "markets": [{"key": "h2h", "outcomes": [
+                {"name": "Fighter C", "price": 1.5}, {"name": "Fighter D", "price": 2.6},
+            ]}]},
+        ],
+    },
+]
+
+
+class StubOddsAPI:
+    """Odds API stub served from a background thread; use as a context manager.
+
+    ``requests`` records ``(path, query, headers)`` for every request.
+    Setting ``fail_status`` and ``failures`` makes the next ``failures``
+    requests answer with that status instead of the events.
+    """
+
+    def __init__(self, events: List[dict] | None = None, host: str = "127.0.0.1", port: int = 0) -> None:
+        self.events = SAMPLE_EVENTS if events is None else events
+        self.requests: List[tuple] = []
+        self.fail_status = 500
+        self.failures = 0
+        self.remaining = 500
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "StubOddsAPI":
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def _answer(self, path: str, query: dict, headers: dict) -> tuple:
+        self.requests.append((path, query, headers))
+        self.remaining -= 1
+        if self.failures > 0:
+            self.failures -= 1
+            return self.fail_status, b'{"message": "stub failure"}', {}
+        if not (path.startswith("/sports/") and path.endswith("/odds")):
+            return 404, b'{"message": "unknown path"}', {}
+        events = self.events
+        if "eventIds" in query:
+            wanted = set(query["eventIds"][-1].split(","))
+            events = [e for e in events if e["id"] in wanted]
+        body = json.dumps(events).encode("utf-8")
+        etag = '"%s"' % hashlib.sha256(body).hexdigest()[:16]
+        if headers.get("if-none-match") == etag:
+            return 304, b"", {"ETag": etag}
+        return 200, body, {"ETag": etag, "Content-Type": "application/json"}
+
+    def _handler(self) -> type:
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, as the real API
+
+            def do_GET(self) -> None:
+                url = urlsplit(self.path)
+                headers = {k.lower(): v for k, v in self.headers.items()}
+                status, body, extra = stub._answer(url.path, parse_qs(url.query), headers)
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(body)))
+                self.send_header("x-requests-remaining", str(stub.remaining))
+                for name, value in extra.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        return Handler
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    with StubOddsAPI(host=args.host, port=args.port) as stub:
+        print(f"Stub odds API on {stub.base_url}/")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Tests for the bets ledger."""
+import csv
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from boxingproject import bet_tracker
+
+BOXING_APP = Path(bet_tracker.__file__).with_name("boxing_app.py")
+
+
+class ConcurrentAppendTest(unittest.TestCase):
+    def test_processes_appending_at_once_write_one_header_and_whole_rows(self):
+        bets_file = Path(tempfile.mkdtemp()) / "bets.csv"
+        procs = [
+            subprocess.Popen(
+                [sys.executable, str(BOXING_APP), "--bets-file", str(bets_file),
+                 "add-bet", f"Fighter {i}", "2.5", str(i + 1), "bk", "--result", "win", "--payout", "9"],
+                stdout=subprocess.DEVNULL,
+            )
+            for i in range(16)
+        ]
+        self.assertEqual([p.wait() for p in procs], [0] * 16)
+        with bets_file.open(newline="") as f:
+            rows = list(csv.reader(f))
+        self.assertEqual(rows[0], bet_tracker.BET_COLUMNS)
+        self.assertEqual(len(rows), 17)
+        self.assertTrue(all(len(row) == 7 for row in rows[1:]))
+        self.assertEqual(sorted(row[1] for row in rows[1:]), sorted(f"Fighter {i}" for i in range(16)))
+        self.assertEqual(bet_tracker.CSVBetStore(bets_file).totals().count, 16)
+
+
+def random_bets(rnd: random.Random, n: int) -> list:
+    return [
+        bet_tracker.Bet(
+            datetime(2025, 1, 1 + i % 28), f"F{i}", round(rnd.uniform(1.1, 9), 2), round(rnd.uniform(0.1, 50), 2),
+            "bk", *rnd.choice([(None, None), ("loss", 0.0), ("win", round(rnd.uniform(1, 400), 2))]),
+        )
+        for i in range(n)
+    ]
+
+
+class TotalsSidecarTest(unittest.TestCase):
+    def setUp(self):
+        self.path = Path(tempfile.mkdtemp()) / "bets.csv"
+
+    def expected(self) -> bet_tracker.BetTotals:
+        store = bet_tracker.CSVBetStore(self.path)
+        return bet_tracker._tally((b.stake, b.payout) for b in store)
+
+    def test_totals_follow_appends_from_other_stores(self):
+        rnd = random.Random(1)
+        for _ in range(5):
+            bet_tracker.CSVBetStore(self.path).extend(random_bets(rnd, rnd.randint(1, 30)))
+            bet_tracker.CSVBetStore(self.path).append(random_bets(rnd, 1)[0])
+            self.assertEqual(bet_tracker.CSVBetStore(self.path).totals(), self.expected())
+        self.assertTrue(bet_tracker.totals_path(self.path).exists())
+
+    def test_rewritten_ledger_is_recounted(self):
+        rnd = random.Random(2)
+        bet_tracker.CSVBetStore(self.path).extend(random_bets(rnd, 40))
+        bet_tracker.CSVBetStore(self.path).totals()
+        for n in (60, 5):  # longer, then shorter than the stored offset
+            self.path.unlink()
+            bet_tracker.CSVBetStore(self.path).extend(random_bets(rnd, n))
+            self.assertEqual(bet_tracker.CSVBetStore(self.path).totals(), self.expected())
+
+    def test_row_being_written_is_not_counted(self):
+        rnd = random.Random(3)
+        bet_tracker.CSVBetStore(self.path).extend(random_bets(rnd, 10))
+        complete = self.path.read_bytes()
+        with self.path.open("ab") as f:
+            f.write(b"2025-01-01,Late,2.0,5")
+        self.assertEqual(bet_tracker.CSVBetStore(self.path).totals().count, 10)
+        with self.path.open("ab") as f:
+            f.write(b".0,bk,,\n")
+        self.assertEqual(bet_tracker.CSVBetStore(self.path).totals(), self.expected())
+        self.assertEqual(self.expected().count, 11)
+        self.assertTrue(self.path.read_bytes().startswith(complete))
+
+    def test_sqlite_totals_match_the_csv(self):
+        bet_tracker.CSVBetStore(self.path).extend(random_bets(random.Random(4), 50))
+        db = self.path.with_suffix(".db")
+        bet_tracker.migrate_csv_to_sqlite(self.path, db)
+        self.assertEqual(bet_tracker.open_store(db).totals(), bet_tracker.CSVBetStore(self.path).totals())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+"""Parity tests: every aggregation path must give the same reports."""
+import math
+import random
+import tempfile
+import unittest
+from pathlib import Path
+
+from boxingproject import odds_aggregate, odds_numpy
+from boxingproject.odds_aggregate import OddsAggregate, incremental_aggregate
+from boxingproject.odds_store import iter_records, read_csv
+
+HEADER = "event_id,time,fighter,decimal_odds,bookmaker,implied_prob\n"
+# Prices whose 2 dp rounding or exact mean is easy to get wrong.
+AWKWARD_PRICES = [1.005, 1.015, 2.675, 1.1, 2.2, 3.3, 0.1, 1e-3, 81.0, 1e8]
+
+
+def random_rows(rnd: random.Random, rows: int) -> list:
+    """Return CSV lines with skewed group sizes and some untimed events."""
+    out = []
+    events = [f"e{i}" for i in range(rnd.randint(5, 40))]
+    times = {}
+    for event in events:
+        times[event] = rnd.choice([f"2030-01-0{rnd.randint(1, 9)}T20:00:00Z", "2030-02-01 18:30", "TBA", ""])
+    for _ in range(rows):
+        # One heavy group so NumPy sums both vectorised and per group.
+        event = events[0] if rnd.random() < 0.3 else rnd.choice(events)
+        fighter = "Heavy" if event == events[0] else f"F{rnd.randint(0, 5)}"
+        price = rnd.choice(AWKWARD_PRICES)
+        if rnd.random() < 0.7:
+            price = round(rnd.uniform(1.01, 15), rnd.randint(1, 4))
+        time = times[event] if rnd.random() < 0.9 else rnd.choice(list(times.values()))
+        out.append(f"{event},{time},{fighter},{price},bk{rnd.randint(0, 6)},{1 / price}\n")
+    return out
+
+
+def reports(agg: OddsAggregate) -> tuple:
+    return agg.fights(), agg.best(), agg.value(0.05), agg.value(-1.0), agg.value(0.05, 3)
+
+
+class ParityTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = Path(tempfile.mkdtemp())
+        self.enabled = odds_numpy.ENABLED
+        self.addCleanup(setattr, odds_numpy, "ENABLED", self.enabled)
+
+    def write(self, name: str, lines: list) -> Path:
+        path = self.tmp / name
+        path.write_text(HEADER + "".join(lines))
+        return path
+
+    def reference(self, path: Path) -> tuple:
+        return reports(OddsAggregate.from_records(iter_records(path)))
+
+    def test_table_matches_streaming_with_and_without_numpy(self):
+        for seed in range(20):
+            path = self.write(f"{seed}.csv", random_rows(random.Random(seed), 600))
+            expected = self.reference(path)
+            for enabled in (False, True) if self.enabled else (False,):
+                with self.subTest(seed=seed, numpy=enabled):
+                    odds_numpy.ENABLED = enabled
+                    self.assertEqual(reports(OddsAggregate.from_table(read_csv(path))), expected)
+
+    def test_float_mean_matches_exact_mean(self):
+        for seed in range(10):
+            path = self.write(f"{seed}.csv", random_rows(random.Random(seed), 600))
+            load = lambda: OddsAggregate.from_records(iter_records(path))
+            agg = load()
+            # Thresholds on, and an ulp either side of, some groups' exact value_pct.
+            pcts = [agg._exact_values(g)[1] for g in list(agg.groups.values())[:5]]
+            thresholds = [t for p in pcts for t in (math.nextafter(p, -1), p, math.nextafter(p, 1))]
+
+            def run(agg: OddsAggregate) -> list:
+                top = [load().value(t, 2) for t in thresholds]  # heap path, no ranking yet
+                return top + [agg.value(t) for t in thresholds] + [reports(agg)]
+
+            got = run(agg)
+            exact_error = odds_aggregate._MEAN_ERROR
+            odds_aggregate._MEAN_ERROR = math.inf  # every group takes the Fraction path
+            try:
+                expected = run(load())
+            finally:
+                odds_aggregate._MEAN_ERROR = exact_error
+            with self.subTest(seed=seed):
+                self.assertEqual(got, expected)
+
+    def test_checkpoint_follows_appends_split_anywhere(self):
+        for seed in range(10):
+            rnd = random.Random(seed)
+            data = (HEADER + "".join(random_rows(rnd, 400))).encode()
+            path = self.tmp / f"{seed}.csv"
+            path.write_bytes(b"")
+            pos = 0
+            while pos < len(data):  # cut at random bytes, often mid-row
+                pos = min(len(data), pos + rnd.randint(1, 3000))
+                path.write_bytes(data[:pos])
+                with self.subTest(seed=seed, offset=pos):
+                    complete = data[:data.rindex(b"\n", 0, pos) + 1] if b"\n" in data[:pos] else b""
+                    ref = self.tmp / "ref.csv"
+                    ref.write_bytes(complete)
+                    got = incremental_aggregate(path)
+                    if complete and pos == len(data):
+                        self.assertEqual(reports(got), self.reference(ref))
+                    elif complete:
+                        # An unterminated last row counts only once it parses.
+                        expected = [self.reference(ref)]
+                        try:
+                            expected.append(self.reference(path))
+                        except (IndexError, ValueError):
+                            pass
+                        self.assertIn(reports(got), expected)
+
+    def test_rewritten_or_truncated_file_is_reread(self):
+        rnd = random.Random(7)
+        path = self.write("odds.csv", random_rows(rnd, 500))
+        incremental_aggregate(path)
+        for lines in (random_rows(rnd, 800), random_rows(rnd, 50)):  # longer, then shorter
+            path.write_text(HEADER + "".join(lines))
+            self.assertEqual(reports(incremental_aggregate(path)), self.reference(path))
+
+    def test_large_files_are_streamed_with_the_same_result(self):
+        path = self.write("odds.csv", random_rows(random.Random(3), 500))
+        limit = odds_aggregate._TABLE_MAX_BYTES
+        odds_aggregate._TABLE_MAX_BYTES = 0
+        try:
+            self.assertEqual(reports(incremental_aggregate(path)), self.reference(path))
+        finally:
+            odds_aggregate._TABLE_MAX_BYTES = limit
+        self.assertFalse(path.with_name("odds.csv.cache").exists())
+        self.assertEqual(reports(incremental_aggregate(path, checkpoint=False)), self.reference(path))
+
+    def test_parallel_workers_merge_to_the_same_result(self):
+        limit = odds_aggregate._PARALLEL_MIN_BYTES
+        odds_aggregate._PARALLEL_MIN_BYTES = 0
+        try:
+            for seed in range(3):
+                rnd = random.Random(seed)
+                first = random_rows(rnd, 400)
+                path = self.write(f"{seed}.csv", first)
+                with self.subTest(seed=seed):
+                    self.assertEqual(reports(incremental_aggregate(path, workers=3)), self.reference(path))
+                    with path.open("a") as f:
+                        f.writelines(random_rows(rnd, 400))
+                    self.assertEqual(reports(incremental_aggregate(path, workers=3)), self.reference(path))
+        finally:
+            odds_aggregate._PARALLEL_MIN_BYTES = limit
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,161 @@
+"""Tests for the odds API client against the local stub server."""
+import asyncio
+import copy
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+from boxingproject import odds_api, odds_dedupe
+from odds_stub import SAMPLE_EVENTS, StubOddsAPI
+
+BOXING_APP = Path(odds_api.__file__).with_name("boxing_app.py")
+
+
+class FetchTest(unittest.TestCase):
+    def setUp(self):
+        self.stub = StubOddsAPI().__enter__()
+        self.addCleanup(self.stub.__exit__)
+        self.tmp = Path(tempfile.mkdtemp())
+
+    def test_rows_follow_odds_csv_layout(self):
+        result = odds_api.fetch_odds("key", regions=["us"], base_url=self.stub.base_url)
+        self.assertEqual(result.events, 2)
+        self.assertEqual(len(result.rows), 6)
+        self.assertEqual(result.rows[0][:5], ["e1", "2030-01-01T20:00:00Z", "Fighter A", 1.8, "bk1"])
+        self.assertEqual(result.remaining, 499)
+
+    def test_api_key_is_sent_but_not_cached(self):
+        cache = odds_api.ResponseCache(self.tmp / "cache", ttl=0)
+        odds_api.fetch_odds("secret", regions=["us"], base_url=self.stub.base_url, cache=cache)
+        self.assertEqual(self.stub.requests[0][1]["apiKey"], ["secret"])
+        for path in (self.tmp / "cache").iterdir():
+            self.assertNotIn(b"secret", path.read_bytes())
+
+    def test_unchanged_payload_is_revalidated(self):
+        cache = odds_api.ResponseCache(self.tmp / "cache", ttl=0)
+        odds_api.fetch_odds("key", regions=["us"], base_url=self.stub.base_url, cache=cache)
+        result = odds_api.fetch_odds("key", regions=["us"], base_url=self.stub.base_url, cache=cache)
+        self.assertIn("if-none-match", self.stub.requests[1][2])
+        self.assertEqual(result.unchanged, 1)
+        self.assertEqual(len(result.rows), 6)
+
+    def test_fresh_payload_is_replayed_from_the_cache(self):
+        cache = odds_api.ResponseCache(self.tmp / "cache")
+        odds_api.fetch_odds("key", regions=["us"], base_url=self.stub.base_url, cache=cache)
+        result = odds_api.fetch_odds("key", regions=["us"], base_url=self.stub.base_url, cache=cache)
+        self.assertEqual(len(self.stub.requests), 1)
+        self.assertEqual((result.events, len(result.rows), result.unchanged), (2, 6, 1))
+
+    def test_validators_only_cache_skips_unchanged_payloads(self):
+        cache = odds_api.ResponseCache(self.tmp / "cache", ttl=0, keep_bodies=False)
+        odds_api.fetch_odds("key", regions=["us"], base_url=self.stub.base_url, cache=cache)
+        result = odds_api.fetch_odds("key", regions=["us"], base_url=self.stub.base_url, cache=cache)
+        self.assertEqual((len(result.rows), result.unchanged), (0, 1))
+        self.assertEqual([p.suffix for p in (self.tmp / "cache").iterdir()], [".json"])
+
+    def test_failed_cache_writes_leave_no_temporary_files(self):
+        cache = odds_api.ResponseCache(self.tmp / "cache")
+        with mock.patch("os.replace", side_effect=OSError("read-only")):
+            result = odds_api.fetch_odds("key", regions=["us"], base_url=self.stub.base_url, cache=cache)
+        self.assertEqual(len(result.rows), 6)
+        self.assertEqual(list((self.tmp / "cache").iterdir()), [])
+
+    def test_event_id_requests_bypass_the_cache(self):
+        cache = odds_api.ResponseCache(self.tmp / "cache")
+        result = odds_api.fetch_odds(
+            "key", regions=["us"], base_url=self.stub.base_url, cache=cache, event_ids=["e2"],
+        )
+        self.assertEqual(len(result.rows), 2)
+        self.assertFalse((self.tmp / "cache").exists())
+
+    def test_error_status_raises(self):
+        self.stub.fail_status, self.stub.failures = 401, 1
+        with self.assertRaises(odds_api.OddsAPIError) as caught:
+            odds_api.fetch_odds("bad", regions=["us"], base_url=self.stub.base_url)
+        self.assertEqual(caught.exception.status, 401)
+
+    def _fetch(self, odds_file):
+        return subprocess.run(
+            [sys.executable, str(BOXING_APP), "--odds-file", str(odds_file), "fetch",
+             "--api-key", "key", "--regions", "us", "--base-url", self.stub.base_url],
+            capture_output=True, text=True,
+        )
+
+    def test_cli_fetch_appends_rows(self):
+        odds_file = self.tmp / "odds.csv"
+        proc = self._fetch(odds_file)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+        self.assertIn("appended 6 rows", proc.stdout)
+        self.assertEqual(odds_file.read_text().splitlines()[0], ",".join(odds_api.ODDS_COLUMNS))
+
+    def test_cli_fetch_error_exits_without_touching_the_odds_file(self):
+        self.stub.fail_status, self.stub.failures = 401, 1
+        odds_file = self.tmp / "odds.csv"
+        proc = self._fetch(odds_file)
+        self.assertEqual(proc.returncode, 1)
+        self.assertTrue(proc.stderr.startswith("Error: 401"), proc.stderr)
+        self.assertFalse(odds_file.exists())
+
+
+class DedupeTest(unittest.TestCase):
+    def test_rescheduled_fight_is_kept_at_the_same_price(self):
+        odds_file = Path(tempfile.mkdtemp()) / "odds.csv"
+        row = ["e1", "2030-01-01T20:00:00Z", "Fighter A", 1.8, "bk1", 1 / 1.8]
+        moved = ["e1", "2030-01-08T20:00:00Z", *row[2:]]
+        self.assertEqual(odds_api.append_rows(odds_file, [row], dedupe=True), 1)
+        self.assertEqual(odds_api.append_rows(odds_file, [row], dedupe=True), 0)
+        self.assertEqual(odds_api.append_rows(odds_file, [moved], dedupe=True), 1)
+        self.assertEqual(odds_api.append_rows(odds_file, [moved, row], dedupe=True), 1)
+
+    def test_rows_appended_around_compaction_are_kept(self):
+        odds_file = Path(tempfile.mkdtemp()) / "odds.csv"
+        row = ["e1", "2030-01-01T20:00:00Z", "Fighter A", 1.8, "bk1", 1 / 1.8]
+        with odds_api.RowAppender(odds_file) as appender:
+            appender.write([row, row])
+            self.assertEqual(odds_dedupe.compact_odds(odds_file), (1, 2))
+            appender.write([[*row[:3], 1.9, *row[4:]]])
+        lines = odds_file.read_text().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[2].startswith("e1,2030-01-01T20:00:00Z,Fighter A,1.9,"))
+
+
+class PollerTest(unittest.TestCase):
+    def test_failed_batches_are_retried(self):
+        tmp = Path(tempfile.mkdtemp())
+        with StubOddsAPI() as stub:
+            stub.failures = 2
+            poller = odds_api.OddsPoller(
+                "key", tmp / "odds.csv", regions=["us"], base_url=stub.base_url, max_rate=100
+            )
+            log = []
+            backoff = odds_api.RETRY_BACKOFF
+            odds_api.RETRY_BACKOFF = 0.01
+            try:
+                asyncio.run(poller.run(3, log=log.append))
+            finally:
+                odds_api.RETRY_BACKOFF = backoff
+        self.assertEqual(len(stub.requests), 3)
+        self.assertIn("poll failed", log[0])
+        self.assertIn("polled 2 events", log[2])
+        self.assertEqual(poller.failures, 0)
+        self.assertEqual(len((tmp / "odds.csv").read_text().splitlines()), 7)
+
+    def test_malformed_outcomes_are_skipped(self):
+        tmp = Path(tempfile.mkdtemp())
+        events = copy.deepcopy(SAMPLE_EVENTS)
+        del events[0]["bookmakers"][0]["markets"][0]["outcomes"][0]["price"]
+        events[1]["bookmakers"][0]["markets"][0]["outcomes"][1]["price"] = "n/a"
+        events.append({"commence_time": "2030-03-01T20:00:00Z"})  # no id
+        with StubOddsAPI(events) as stub:
+            poller = odds_api.OddsPoller("key", tmp / "odds.csv", regions=["us"], base_url=stub.base_url)
+            log = []
+            asyncio.run(poller.run(1, log=log.append))
+        self.assertIn("polled 2 events", log[0])
+        self.assertEqual(len((tmp / "odds.csv").read_text().splitlines()), 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,24 @@
+"""Import-graph checks for the cron and CLI entry points.
+
+The timing budgets depend on the machine and are left to
+``tools/startup_budget.py``; which modules get imported does not.
+"""
+import tempfile
+import unittest
+
+from tools import startup_budget
+
+
+class ForbiddenImportTest(unittest.TestCase):
+    def test_no_case_imports_a_forbidden_module(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            startup_budget.prepare(tmp)
+            for name, case in startup_budget.CASES.items():
+                with self.subTest(name):
+                    startup_budget.run_sample(case.argv, tmp)  # first run writes checkpoints
+                    sample = startup_budget.run_sample(case.argv, tmp)
+                    self.assertEqual(startup_budget.forbidden_imports(case, sample), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,140 @@
+"""Check the startup cost of the scripts run from cron and shell pipelines.
+
+Each case runs in a fresh interpreter under ``python -X importtime`` and the
+time spent importing modules, beyond what the interpreter itself loads at
+startup, is compared with the case's budget.  Modules listed as forbidden
+must not be imported at all, which catches regressions regardless of
+machine speed; ``tests/test_startup.py`` runs that part under pytest.
+
+Usage::
+
+    python tools/startup_budget.py                       # every case in CASES
+    python tools/startup_budget.py odds_api "boxing_app add-bet"
+
+Exits with status 1 if any case is over budget.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Set, Tuple
+
+# Cases run from the package directory, as the cron jobs do.
+PACKAGE_DIR = Path(__file__).resolve().parent.parent / "boxingproject"
+
+
+class Case(NamedTuple):
+    argv: Tuple[str, ...]  # arguments after ``python -X importtime``; {tmp} is a scratch directory
+    budget_ms: float  # median import time allowed
+    forbidden: Tuple[str, ...] = ()
+
+
+_FILES = ("--odds-file", "{tmp}/odds.csv", "--bets-file", "{tmp}/bets.csv")
+_FETCHER = ("pandas", "requests", "asyncio", "ssl")
+_ODDS = ("odds_store", "odds_aggregate", "odds_api", "odds_dedupe", "odds_numpy")
+_NOT_REPORTS = ("bet_tracker", "odds_api", "asyncio", "numpy", "concurrent.futures")
+
+CASES: Dict[str, Case] = {
+    "odds_api": Case(("-c", "import odds_api"), 30.0, _FETCHER + ("json", "csv")),
+    "API": Case(("-c", "import API"), 30.0, _FETCHER),
+    "untitled": Case(("-c", "import untitled"), 30.0, _FETCHER),
+    "boxing_app add-bet": Case(
+        ("boxing_app.py", *_FILES, "add-bet", "Fighter", "2.5", "10", "bookie"), 70.0, _ODDS + ("asyncio",)
+    ),
+    "boxing_app summary": Case(("boxing_app.py", *_FILES, "summary"), 70.0, _ODDS + ("asyncio",)),
+    "boxing_app fights": Case(("boxing_app.py", *_FILES, "fights"), 60.0, _NOT_REPORTS + ("fractions",)),
+    "boxing_app value": Case(("boxing_app.py", *_FILES, "value"), 65.0, _NOT_REPORTS),
+}
+
+_SAMPLE_ODDS = (
+    "event_id,time,fighter,decimal_odds,bookmaker,implied_prob\n"
+    "e1,2030-01-01T20:00:00Z,A,1.8,bk1,0.55\n"
+    "e1,2030-01-01T20:00:00Z,A,2.1,bk2,0.47\n"
+    "e1,2030-01-01T20:00:00Z,B,2.0,bk1,0.5\n"
+)
+
+
+class Sample(NamedTuple):
+    top_level: Dict[str, int]  # cumulative µs of each import made directly by the program
+    modules: Set[str]  # every module imported
+    wall: float  # seconds for the whole process
+
+
+def prepare(tmp: str) -> None:
+    """Write the sample odds file the cases read into ``tmp``."""
+    Path(tmp, "odds.csv").write_text(_SAMPLE_ODDS)
+
+
+def run_sample(argv: Tuple[str, ...], tmp: str) -> Sample:
+    """Run ``argv`` in a fresh interpreter and parse its import log."""
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)  # measure with warm bytecode, as repeated runs do
+    args = [sys.executable, "-X", "importtime", *(a.format(tmp=tmp) for a in argv)]
+    start = time.perf_counter()
+    proc = subprocess.run(args, cwd=PACKAGE_DIR, env=env, capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - start
+    sample = Sample({}, set(), wall)
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented by two extra spaces per level.
+        if not name.startswith("  "):
+            sample.top_level[name.strip()] = int(cumulative)
+        sample.modules.add(name.strip())
+    return sample
+
+
+def check(name: str, case: Case, baseline: Set[str], tmp: str, runs: int = 5) -> List[str]:
+    """Return the budget violations for ``case``; empty when within budget."""
+    run_sample(case.argv, tmp)  # warm the bytecode cache and write checkpoints
+    samples = [run_sample(case.argv, tmp) for _ in range(runs)]
+    import_ms = statistics.median(
+        sum(us for mod, us in s.top_level.items() if mod not in baseline) for s in samples
+    ) / 1000
+    wall_ms = statistics.median(s.wall for s in samples) * 1000
+    print(f"{name}: imports {import_ms:.1f} ms (budget {case.budget_ms:.0f} ms), process {wall_ms:.1f} ms")
+    problems = []
+    if import_ms > case.budget_ms:
+        problems.append(f"{name} spends {import_ms:.1f} ms importing, budget is {case.budget_ms:.0f} ms")
+    for module in forbidden_imports(case, samples[0]):
+        problems.append(f"{name} imports {module}")
+    return problems
+
+
+def forbidden_imports(case: Case, sample: Sample) -> List[str]:
+    """Return the forbidden modules, or packages, that ``sample`` imported."""
+    return [
+        module for module in case.forbidden
+        if any(m == module or m.startswith(module + ".") for m in sample.modules)
+    ]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("cases", nargs="*", default=list(CASES), help="case names (default: all)")
+    parser.add_argument("--runs", type=int, default=5, help="interpreter starts per case")
+    args = parser.parse_args()
+    unknown = [c for c in args.cases if c not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    problems: List[str] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        prepare(tmp)
+        baseline = run_sample(("-c", "pass"), tmp).modules
+        for name in args.cases:
+            problems += check(name, CASES[name], baseline, tmp, args.runs)
+    for problem in problems:
+        print("FAIL:", problem)
+    sys.exit(1 if problems else 0)
+
+
+if __name__ == "__main__":
+    main()